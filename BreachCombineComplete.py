@@ -1,342 +1,165 @@
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
 import re
+import codecs
 import csv
 import os
+import glob
+import json
+import sys
+import signal
+import time
+import random
 import pandas as pd
 from io import StringIO
 import warnings
-from datetime import datetime
+from datetime import datetime, timedelta
 from tqdm import tqdm
-import io
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+import threading
+from breach_engine import evaluate_historic_csv, ignore_interrupts, split_historic_csv, join_historic_csv, plan_historic_pieces, split_window, segment_origin
+from prtg_cache import ResponseCache, SensorInfoCache, fingerprint
+from prtg_schedule import parse_schedule
+from prtg_sketch import QuantileSketch
+from prtg_cassette import Cassette, RecordingAdapter, ReplayAdapter
+from prtg_metrics import RunMetrics
+from prtg_throttle import AdaptiveLimiter, CircuitBreaker, ThrottledAdapter
 
 
+# PRTG's degree sign arrives mangled; once decoded it shows up as U+FFFD
+mangled_unit_pattern = re.compile(r'\(�C\)|�C')
+
 def remove_characters(text):
-    cleaned_text = re.sub(r'\(�C\)|�C', '', text)
+    cleaned_text = mangled_unit_pattern.sub('', text)
     return cleaned_text
 
-prtg_choice = input("Enter the PRTG you want (99.100, 101.100, 99.102): ")
-
-if prtg_choice == "99.100":
-    with open("server_address-99.100.txt", "r") as file:
-       server_parameters = dict(line.strip().split("=") for line in file)
-elif prtg_choice == "101.100":
-    with open("server_address-101.100.txt", "r") as file:
-        server_parameters = dict(line.strip().split("=") for line in file)
-elif prtg_choice == "99.102":
-    with open("server_address-99.102.txt", "r") as file:
-        server_parameters = dict(line.strip().split("=") for line in file)
-else:
-    print("Invalid input! Please enter either '99.100', '101.100', or '99.102'.")
-    exit()
-
-
-
-server_address = server_parameters.get("server")
-username = server_parameters.get("username")
-passhash = server_parameters.get("passhash")
-param = server_parameters.get("day")
-
-
-current_datetime = datetime.now().strftime("%d %B %Y %I:%M %p")
+def decode_prtg_bytes(error):
+    # Bytes that aren't valid UTF-8 are read as latin-1, which is what the old
+    # utf-8 / latin-1 file retry amounted to. The exception is a stray 0xB0
+    # (a latin-1 degree sign), which becomes U+FFFD so remove_characters drops
+    # the mangled unit it belongs to.
+    invalid_bytes = error.object[error.start:error.end]
+    return ''.join('�' if byte == 0xb0 else chr(byte) for byte in invalid_bytes), error.end
 
-if server_address and "99-102" in server_address:
-    h2_content = f"Prtg-99-102-Logs-{current_datetime}"
-elif server_address and "101-100" in server_address:
-     h2_content = f"Prtg-101-100 Logs-{current_datetime}"
-elif server_address and "99-100" in server_address:
-    h2_content = f"Prtg-99-100 Logs-{current_datetime}"
-else:
-    h2_content ="PRTG LOGS"
+codecs.register_error('prtg-sanitize', decode_prtg_bytes)
 
-current_datetime = datetime.now().strftime("%d_%B_%Y_%I_%M_%p")
+def iter_cleaned_text(response, archive=None):
+    # Single pass over the raw body: each chunk of bytes is decoded as UTF-8
+    # (see decode_prtg_bytes for invalid bytes) and stripped of mangled units.
+    # A multi-byte character split across chunks is kept by the incremental
+    # decoder, and the last few characters are held back so a (°C) sequence
+    # split across chunks is still caught.
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='prtg-sanitize')
+    pending = ''
+    for chunk in response.iter_content(chunk_size=65536):
+        pending += decoder.decode(chunk)
+        safe = max(len(pending) - 3, 0)
+        for match in mangled_unit_pattern.finditer(pending, max(safe - 3, 0)):
+            if match.start() >= safe:
+                break
+            if match.end() > safe:
+                safe = match.start()
+                break
+        cleaned_text = remove_characters(pending[:safe])
+        pending = pending[safe:]
+        if archive is not None:
+            archive(cleaned_text)
+        yield cleaned_text
+    cleaned_text = remove_characters(pending + decoder.decode(b'', final=True))
+    if archive is not None:
+        archive(cleaned_text)
+    yield cleaned_text
 
-if "99-102" in server_address:
-    file_path = f"prtg-{current_datetime}-99.102.xml"
-    output_file= f"prtg-{current_datetime}-99.102.txt"
-       
-elif "101-100" in server_address:
-    file_path = f"prtg-{current_datetime}-101.100.xml"
-    output_file= f"prtg-{current_datetime}-101.100.txt"
-elif "99-100" in server_address:
-    file_path = f"prtg-{current_datetime}-99.100.xml"
-    output_file= f"prtg-{current_datetime}-99.100.txt"
-else:
-    file_path = f"prtg-{current_datetime}-default.xml"
+def iter_sensortree(response, archive=None):
+    """Yield one record per <sensor> of a streamed sensortree response.
 
-print(f"File path to save XML: {file_path}")
+    Elements are dropped from the tree as soon as they close, so memory stays
+    proportional to a single sensor rather than the whole document. Each record
+    carries the sensor's id, type and name plus the names of the probe, group
+    and device it sits under. The cleaned text is also passed to archive, if
+    given, as it streams in.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    # Open elements, innermost last, and the probenode/group/device among them
+    open_elements = []
+    containers = []
 
-api_endpoint = f'https://{server_address}/api/table.xml?content=sensortree&username={username}&passhash={passhash}'
+    for text in iter_cleaned_text(response, archive):
+        parser.feed(text)
+        for event, element in parser.read_events():
+            if event == 'start':
+                open_elements.append(element)
+                if element.tag in ('probenode', 'group', 'device'):
+                    containers.append({"tag": element.tag, "name": "N/A", "id": "N/A"})
+                continue
 
-response = requests.get(api_endpoint)
-
-# Check if the request was successful
-if response.status_code == 200:
-    print("Request successful!")
-    print("Response content:")
-    print(response.text)
-
-    # Ensure the response content is not empty
-    if response.text.strip():
-        # Write the XML response to a file
-        try:
-            with open(file_path, "w") as file:
-                file.write(response.text)
-            print(f"XML data saved to {file_path}")
-        except Exception as e:
-            print(f"Error writing to file: {e}")
-    else:
-        print("The response text is empty. No data to save.")
-else:
-    print(f"Error: {response.status_code} - {response.text}")
-
-
-encodings_to_try = ['utf-8', 'latin-1']
-
-for encoding in encodings_to_try:
-    try:
-        with open(file_path, 'r', encoding=encoding) as file:
-            xml_content = file.read()
-        break
-    except UnicodeDecodeError:
-        continue
+            open_elements.pop()
+            parent = open_elements[-1] if open_elements else None
 
-cleaned_xml_content = remove_characters(xml_content)
+            if element.tag == 'sensor':
+                context = {"probenode": "N/A", "group": "N/A", "device": {"name": "N/A", "id": "N/A"}}
+                for container in containers:
+                    if container["tag"] == 'device':
+                        context["device"] = container
+                    else:
+                        context[container["tag"]] = container["name"]
+                yield {
+                    "id": element.findtext('id'),
+                    "sensortype": element.findtext('sensortype'),
+                    "sensor_name": element.findtext('name', "N/A"),
+                    "device_name": context["device"]["name"],
+                    "device_id": context["device"]["id"],
+                    "probe": context["probenode"],
+                    "group": context["group"]
+                }
+            elif parent is not None and parent.tag in ('probenode', 'group', 'device') and element.tag in ('name', 'id'):
+                containers[-1][element.tag] = element.text or "N/A"
 
-try:
-    root = ET.fromstring(cleaned_xml_content)
-    tree = ET.ElementTree(root)
+            if element.tag in ('probenode', 'group', 'device'):
+                containers.pop()
 
-    # Save the modified XML back to a file
-    tree.write(file_path)
-    print("XML file cleaned successfully!")
-except ET.ParseError as e:
-    print("Error parsing XML:", e)
+            # Children of a sensor are kept until the sensor itself closes
+            if parent is not None and not any(open_element.tag == 'sensor' for open_element in open_elements):
+                parent.remove(element)
 
+    parser.close()
 
-tree = ET.parse(file_path)
-root = tree.getroot()
+def group_report_rows(df):
+    """Group report rows by message, device name, sensor name and sensor ID for the HTML page."""
+    grouped_data = {}
 
-# Define sensor IDs
-sensor_ids = []
+    # Breach intervals (breach_output=intervals) are listed under their first
+    # sample's date along with the rest of the interval; Traffic Total is the peak
+    dates = df['Date']
+    if 'End Date' in df.columns:
+        dates = [date if pd.isnull(end_date) or samples == 1 else f"{date} to {end_date} ({samples:.0f} samples over {duration:.0f}s, mean {mean:.2f} Mbps)"
+                 for date, end_date, duration, mean, samples in zip(df['Date'], df['End Date'], df['Duration (s)'], df['Mean Traffic'], df['Samples'])]
 
-for sensor in root.iter('sensor'):
-    sensortype = sensor.find('sensortype')
-    if sensortype is not None and sensortype.text == 'SNMP Traffic':
-        sensor_id = sensor.find('id')
-        if sensor_id is not None:
-            sensor_ids.append(sensor_id.text)
+    # Plain column iteration; iterrows would build a Series for every row
+    for message, device_name, sensor_id, sensor_name, traffic_total, date in zip(
+            df['Message'], df['Device Name'], df['Sensor ID'], df['Sensor Name'], df['Traffic Total'], dates):
+        if message not in grouped_data:
+            grouped_data[message] = {}
 
-with open(output_file, 'w') as file:
-    for i, sensor_id in enumerate(sensor_ids, start=1):
-        file.write(f"id{i}={sensor_id}\n")
+        if device_name not in grouped_data[message]:
+            grouped_data[message][device_name] = {}
 
+        if sensor_name not in grouped_data[message][device_name]:
+            grouped_data[message][device_name][sensor_name] = {}
 
-print("Sensor IDs for SNMP Traffic sensors have been saved to:", output_file)
+        if sensor_id not in grouped_data[message][device_name][sensor_name]:
+            grouped_data[message][device_name][sensor_name][sensor_id] = {
+                'SensorName': sensor_name,
+                'Details': []
+            }
 
-warnings.filterwarnings("ignore", category=DeprecationWarning)
+        grouped_data[message][device_name][sensor_name][sensor_id]['Details'].append((date, traffic_total))
 
-flags = {}
-id_prefix = 'id'
-id_values = []
+    return grouped_data
 
-with open("min_max_flags.txt", "r") as file:
-    for line in file:
-        line = line.strip()
-        if "=" in line:
-            key, value = line.split("=")
-            if key.startswith(id_prefix):
-                id_values.append(value)
-            else:
-                flags[key] = value
-
-with open(output_file, "r") as file:
-    for line in file:
-        line = line.strip()
-        if "=" in line:
-            key, value = line.split("=")
-            if key.startswith(id_prefix):
-                id_values.append(value)
-
-upper_warning_limits = {}
-
-for id_value in tqdm(id_values, desc="Getting upper warning for Each IDs"):
-    try:
-        api_endpoint_upper_warning = f'https://{server_address}/api/getobjectproperty.htm?subtype=channel&id={id_value}&subid=-1&name=limitmaxwarning&show=nohtmlencode&username={username}&passhash={passhash}'
-        response_upper_warning = requests.get(api_endpoint_upper_warning)
-        
-        if response_upper_warning.status_code != 200:
-            print(f"Check parameters for: {id_value}")
-            continue
-            
-        match_upper_warning = re.search(r'<result>(\d+)</result>', response_upper_warning.text)
-        
-        if match_upper_warning is not None:
-            upper_warning_limits[id_value] = float(match_upper_warning.group(1)) * 8 / 1000000
-        else:
-            print(f"Warning: Upper warning limit value not set for ID: {id_value}. Skipping.")
-            continue
-    except Exception as e:
-        print(f"Error getting upper warning limit for ID {id_value}: {e}")
-        continue
-
-output_data = []
-
-for id_value in id_values:
-    if id_value not in upper_warning_limits:
-        # Fetch device details for IDs without upper warning limits
-        try:
-            api_endpoint = f'https://{server_address}/api/getsensordetails.json?id={id_value}&username={username}&passhash={passhash}'
-            response = requests.get(api_endpoint)
-            
-            if response.status_code == 200:
-                device_details = response.json().get("sensordata")
-                parent_device_name = device_details.get("parentdevicename", "N/A")
-                sensor_device_name = device_details.get("name", "N/A")
-                DeviceID = device_details.get("parentdeviceid", "N/A")
-                
-                output_data.append({
-                    "Device Name": parent_device_name,
-                    "Device ID": DeviceID,
-                    "Sensor Name": sensor_device_name,
-                    "Sensor ID": id_value,
-                    "Date": "NA",
-                    "Message":"Upper Warning Limit Not Set",
-                    "Traffic Total": "N/A"
-                })
-            else:
-                print(f"Error: Unable to get device details for ID: {id_value}")
-        except Exception as e:
-            print(f"Error fetching device details for ID {id_value}: {e}")
-
-for id_value in tqdm(id_values, desc="Processing IDs"):
-    parent_device_name = "N/A"
-    sensor_device_name = "N/A"
-    DeviceID = "N/A"
-    
-    try:
-        # Fetch historic data CSV
-        api_endpoint = f'https://{server_address}/api/historicdata.csv?id={id_value}&avg={flags.get("avg")}&sdate={flags.get("sdate")}&edate={flags.get("edate")}&username={username}&passhash={passhash}'
-        response = requests.get(api_endpoint)
-        df = pd.read_csv(io.StringIO(response.text))
-        
-        # Clean and process data
-        df['Traffic Total (Speed)'] = df['Traffic Total (Speed)'].astype(str).str.replace(',', '').str.extract(r'(\d+\.*\d*)').astype(float)
-        selected_data = df["Traffic Total (Speed)"]
-    except KeyError:
-        print(f"Traffic Total (Speed) column not found for ID: {id_value}")
-        continue  
-    
-    if id_value not in upper_warning_limits:
-        # Skip further processing if upper warning limit is not set
-        continue
-    
-    # Filter data based on upper warning limits
-    filtered_data = selected_data[selected_data > upper_warning_limits.get(id_value)]
-
-    try:
-        # Fetch sensor details
-        api_endpoint = f'https://{server_address}/api/getsensordetails.json?id={id_value}&username={username}&passhash={passhash}'
-        device_name_response = requests.get(api_endpoint)
-        
-        if device_name_response.status_code == 200:
-            device_name_json = device_name_response.json()
-            parent_device_name = device_name_json["sensordata"]["parentdevicename"]
-            sensor_device_name = device_name_json["sensordata"]["name"]
-            DeviceID = device_name_json["sensordata"]["parentdeviceid"]
-        else:
-            print(f"Error: Unable to get device details for ID: {id_value}")
-    except Exception as e:
-        print(f"Error fetching device details for ID {id_value}: {e}")
-        continue
-    
-    # Collect data for output
-    if not filtered_data.empty:
-        output_data.extend([{
-            "Device Name": parent_device_name,
-            "Device ID": DeviceID,
-            "Sensor Name": sensor_device_name,
-            "Sensor ID": id_value,
-            "Date": row['Date Time'] if row['Traffic Total (Speed)'] > upper_warning_limits.get(id_value) else "N/A",
-            "Message":"Traffic total cross upper warning limit",
-            "Traffic Total": row["Traffic Total (Speed)"]
-            
-        } for index, row in df.iterrows() if row['Traffic Total (Speed)'] > upper_warning_limits.get(id_value)])
-    else:
-        max_traffic = selected_data.max()
-        max_traffic_date = df.loc[df['Traffic Total (Speed)'].idxmax(), 'Date Time'] if not pd.isnull(df['Traffic Total (Speed)'].max()) else "N/A"
-        
-        output_data.append({
-            "Device Name": parent_device_name,
-            "Device ID": DeviceID,
-            "Sensor Name": sensor_device_name,
-            "Sensor ID": id_value,
-            "Date": max_traffic_date,
-            "Message":"Traffic total is under upper warning limit",
-            "Traffic Total": max_traffic
-        })
-
-output_df = pd.DataFrame(output_data)
-
-if "99-102" in server_address:
-    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    csv_file = f"prtg-{current_datetime}-99.102.csv"
-
-if "99-100" in server_address:
-    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    csv_file = f"prtg-{current_datetime}-99.100.csv"
-
-if "101-100" in server_address:
-    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    csv_file = f"prtg-{current_datetime}-99.101.csv"
-
-# Define the output directory
-output_directory = "output"
-os.makedirs(output_directory, exist_ok=True)
-
-# Generate output file path using csv_file
-output_file_path = os.path.join(output_directory, csv_file)
-
-# Create a DataFrame from output_data
-output_df = pd.DataFrame(output_data)
-
-# Save DataFrame to CSV
-output_df.to_csv(output_file_path, index=False)
-
-# Print confirmation message
-print(f"\nOutput has been saved to {output_file_path}")
-
-df = pd.read_csv(output_file_path)
-
-grouped_data = {}
-for _, row in df.iterrows():
-    message = row['Message']
-    device_name = row['Device Name']
-    sensor_id = row['Sensor ID']
-    sensor_name = row['Sensor Name']
-    traffic_total = row['Traffic Total']
-    date = row['Date']
-    
-    if message not in grouped_data:
-        grouped_data[message] = {}
-    
-    if device_name not in grouped_data[message]:
-        grouped_data[message][device_name] = {}
-        
-    if sensor_name not in grouped_data[message][device_name]:
-        grouped_data[message][device_name][sensor_name] = {}
-    
-    if sensor_id not in grouped_data[message][device_name][sensor_name]:
-        grouped_data[message][device_name][sensor_name][sensor_id] = {
-            'SensorName': sensor_name,
-            'Details': []
-        }
-    
-    grouped_data[message][device_name][sensor_name][sensor_id]['Details'].append((date, traffic_total))
-
-# Generate HTML content
-html_content = """
+report_head = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -390,65 +213,1195 @@ function toggleDetails(elementId) {
 </script>
 </head>
 <body>
-<h2>%s</h2>
-<ul>
-"""% h2_content
+"""
 
-# Loop through grouped data and create HTML structure
-for message, devices in grouped_data.items():
+def message_class_for(message):
     if "Traffic total cross upper warning limit" in message:
-        message_class = "red"
+        return "red"
     elif "Traffic total is under upper warning limit" in message:
-        message_class = "green"
+        return "green"
     elif "Upper Warning Limit Not Set" in message:
-        message_class = "brown"
+        return "brown"
     else:
-        message_class = ""
-    
-    html_content += f"<li class='{message_class}'><a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('{message.replace(' ', '_')}')\" >{message} ({len(devices)})</a>"
-    html_content += f"<ul id='{message.replace(' ', '_')}' class='sub-list hidden {message_class}'>"
-    
-    for device_name, sensors in devices.items():
-        html_content += f"<li class='{message_class}'><a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('{message.replace(' ', '_')}_{device_name.replace(' ', '_')}')\" >Device Name: {device_name}</a>"
-        html_content += f"<ul id='{message.replace(' ', '_')}_{device_name.replace(' ', '_')}' class='sub-list hidden {message_class}'>"
-        
-        for sensor_name, sensor_ids in sensors.items():
-            html_content += f"<li class='{message_class}'><a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('{message.replace(' ', '_')}_{device_name.replace(' ', '_')}_{sensor_name.replace(' ', '_')}')\">Sensor Name: {sensor_name}</a>"
-            html_content += f"<ul id='{message.replace(' ', '_')}_{device_name.replace(' ', '_')}_{sensor_name.replace(' ', '_')}' class='sub-list hidden {message_class}'>"
-            
-            for sensor_id, details in sensor_ids.items():
-               # html_content += f"<li class='{message_class}'><a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('{message.replace(' ', '_')}_{device_name.replace(' ', '_')}_{sensor_name.replace(' ', '_')}_{sensor_id}')\">Sensor ID: {sensor_id}</a>"
-                html_content += f"<li class='{message_class}'><a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('{message.replace(' ', '_')}_{device_name.replace(' ', '_')}_{sensor_name.replace(' ', '_')}_{sensor_id}')\">Sensor ID: <a href=\"https://{server_address}/sensor.htm?id={sensor_id}\">{sensor_id}</a></a>"
-
-                html_content += f"<ul id='{message.replace(' ', '_')}_{device_name.replace(' ', '_')}_{sensor_name.replace(' ', '_')}_{sensor_id}' class='sub-list hidden {message_class}'>"
-                html_content += f"<li class='{message_class}'><strong>Dates and Traffic Total:</strong><ul>"
-                for date, traffic_total in details['Details']:
-                    html_content += f"<li class='{message_class}'>{date} - Traffic Total: {traffic_total} Mbps</li>"
-                html_content += "</ul></li>"
-                html_content += "</ul></li>"
-            
-            html_content += "</ul></li>"
-        
-        html_content += "</ul></li>"
-    
-    html_content += "</ul></li>"
-
-html_content += """
-</ul>
-</body>
-</html>
+        return ""
+
+def write_report_section(file, h2_content, server_address, grouped_data, id_prefix=""):
+    """Write the HTML heading and list for one server's grouped report rows to file.
+
+    Fragments go straight to the (buffered) file and each element ID is built
+    once from its parent's, so time and memory stay linear in the number of
+    rows. id_prefix keeps element IDs unique when several sections share a page.
+    """
+    write = file.write
+    write("<h2>%s</h2>\n<ul>\n" % h2_content)
+
+    # Loop through grouped data and create HTML structure
+    for message, devices in grouped_data.items():
+        message_class = message_class_for(message)
+
+        item_open = f"<li class='{message_class}'>"
+        link_open = f"<a class='{message_class}' href='javascript:void(0)' onclick=\"toggleDetails('"
+        list_class = f"' class='sub-list hidden {message_class}'>"
+
+        message_id = f"{id_prefix}{message.replace(' ', '_')}"
+        write(f"{item_open}{link_open}{message_id}')\" >{message} ({len(devices)})</a>")
+        write(f"<ul id='{message_id}{list_class}")
+
+        for device_name, sensors in devices.items():
+            device_id = f"{message_id}_{device_name.replace(' ', '_')}"
+            write(f"{item_open}{link_open}{device_id}')\" >Device Name: {device_name}</a>")
+            write(f"<ul id='{device_id}{list_class}")
+
+            for sensor_name, sensor_ids in sensors.items():
+                sensor_name_id = f"{device_id}_{sensor_name.replace(' ', '_')}"
+                write(f"{item_open}{link_open}{sensor_name_id}')\">Sensor Name: {sensor_name}</a>")
+                write(f"<ul id='{sensor_name_id}{list_class}")
+
+                for sensor_id, details in sensor_ids.items():
+                    element_id = f"{sensor_name_id}_{sensor_id}"
+                    write(f"{item_open}{link_open}{element_id}')\">Sensor ID: <a href=\"https://{server_address}/sensor.htm?id={sensor_id}\">{sensor_id}</a></a>")
+                    write(f"<ul id='{element_id}{list_class}")
+                    write(f"{item_open}<strong>Dates and Traffic Total:</strong><ul>")
+                    for date, traffic_total in details['Details']:
+                        write(f"{item_open}{date} - Traffic Total: {traffic_total} Mbps</li>")
+                    write("</ul></li></ul></li>")
+
+                write("</ul></li>")
+
+            write("</ul></li>")
+
+        write("</ul></li>")
+
+    write("\n</ul>\n")
+
+# Used by report_mode=lazy: the page carries the grouped rows as JSON and
+# builds each level of the list the first time it is expanded. Breach samples
+# are shown page_size at a time.
+lazy_report_script = """<script>
+function makeItem(className, label, renderChildren) {
+    var item = document.createElement('li');
+    item.className = className;
+    var link = document.createElement('a');
+    link.className = className;
+    link.href = 'javascript:void(0)';
+    link.textContent = label;
+    var list = document.createElement('ul');
+    list.className = 'sub-list hidden ' + className;
+    link.onclick = function () {
+        if (renderChildren) {
+            renderChildren(list);
+            renderChildren = null;
+        }
+        list.classList.toggle('hidden');
+    };
+    item.appendChild(link);
+    item.appendChild(list);
+    return item;
+}
+
+function renderDetails(list, className, dates, traffic, pageSize) {
+    var item = document.createElement('li');
+    item.className = className;
+    var heading = document.createElement('strong');
+    heading.textContent = 'Dates and Traffic Total:';
+    var samples = document.createElement('ul');
+    var pager = document.createElement('div');
+    var pages = Math.ceil(dates.length / pageSize);
+    var page = 0;
+
+    function pageButton(label, target) {
+        var button = document.createElement('button');
+        button.textContent = label;
+        button.disabled = target < 0 || target >= pages;
+        button.onclick = function () { page = target; show(); };
+        return button;
+    }
+
+    function show() {
+        samples.textContent = '';
+        for (var i = page * pageSize; i < Math.min((page + 1) * pageSize, dates.length); i++) {
+            var sample = document.createElement('li');
+            sample.className = className;
+            sample.textContent = dates[i] + ' - Traffic Total: ' + traffic[i] + ' Mbps';
+            samples.appendChild(sample);
+        }
+        pager.textContent = '';
+        if (pages > 1) {
+            pager.appendChild(pageButton('Previous', page - 1));
+            pager.appendChild(document.createTextNode(' Page ' + (page + 1) + ' of ' + pages + ' (' + dates.length + ' samples) '));
+            pager.appendChild(pageButton('Next', page + 1));
+        }
+    }
+
+    show();
+    item.appendChild(heading);
+    item.appendChild(samples);
+    item.appendChild(pager);
+    list.appendChild(item);
+}
+
+function renderReport(prefix, serverAddress, pageSize) {
+    var messages = JSON.parse(document.getElementById(prefix + 'report-data').textContent);
+    var root = document.getElementById(prefix + 'report');
+    messages.forEach(function (message) {
+        var className = message[1];
+        var devices = message[2];
+        root.appendChild(makeItem(className, message[0] + ' (' + devices.length + ')', function (list) {
+            devices.forEach(function (device) {
+                list.appendChild(makeItem(className, 'Device Name: ' + device[0], function (list) {
+                    device[1].forEach(function (sensor) {
+                        list.appendChild(makeItem(className, 'Sensor Name: ' + sensor[0], function (list) {
+                            sensor[1].forEach(function (entry) {
+                                var item = makeItem(className, 'Sensor ID: ', function (list) {
+                                    renderDetails(list, className, entry[1], entry[2], pageSize);
+                                });
+                                var sensorLink = document.createElement('a');
+                                sensorLink.href = 'https://' + serverAddress + '/sensor.htm?id=' + encodeURIComponent(entry[0]);
+                                sensorLink.textContent = entry[0];
+                                item.insertBefore(sensorLink, item.lastChild);
+                                list.appendChild(item);
+                            });
+                        }));
+                    });
+                }));
+            });
+        }));
+    });
+}
+</script>
 """
-if "101-100" in server_address:
- with open(f"prtg-{current_datetime}-101.100.html", "w") as file:
-    file.write(html_content)
-    webbrowser.open(f"prtg-{current_datetime}-101.100.html")
-if "99-100" in server_address:
- with open(f"prtg-{current_datetime}-99.100.html", "w") as file:
-    file.write(html_content)
-    webbrowser.open(f"prtg-{current_datetime}-99.100.html")
-if "99-102" in server_address:
- with open(f"prtg-{current_datetime}-99.102.html", "w") as file:
-    file.write(html_content)
-    webbrowser.open(f"prtg-{current_datetime}-99.102.html")
-
-print("HTML page generated successfully.")
+
+def write_lazy_report_section(file, h2_content, server_address, grouped_data, id_prefix="", page_size=500):
+    """Write one server's grouped report rows as a JSON payload plus an empty list for renderReport to fill.
+
+    Per sensor ID the dates and traffic values are stored as two columns of
+    strings, formatted exactly as the full report prints them.
+    """
+    payload = [[message, message_class_for(message),
+                [[device_name,
+                  [[sensor_name,
+                    [[str(sensor_id), [str(date) for date, _ in details['Details']], [str(traffic_total) for _, traffic_total in details['Details']]]
+                     for sensor_id, details in sensor_ids.items()]]
+                   for sensor_name, sensor_ids in sensors.items()]]
+                 for device_name, sensors in devices.items()]]
+               for message, devices in grouped_data.items()]
+
+    file.write("<h2>%s</h2>\n<ul id='%sreport'></ul>\n" % (h2_content, id_prefix))
+    # "</" is escaped so no value can close the script element early
+    file.write(f"<script type='application/json' id='{id_prefix}report-data'>")
+    for fragment in json.JSONEncoder(separators=(',', ':')).iterencode(payload):
+        file.write(fragment.replace("</", "<\\/"))
+    file.write("</script>\n")
+    file.write(f"<script>renderReport({json.dumps(id_prefix)}, {json.dumps(server_address)}, {int(page_size)});</script>\n")
+
+def write_html_report(html_path, sections, report_mode="full", page_size=500):
+    """Write one HTML page from [(heading, server address, grouped rows, element ID prefix)].
+
+    report_mode=lazy embeds the rows as JSON and renders them in the browser on
+    demand instead of writing every breach sample as a list item.
+    """
+    with open(html_path, "w", buffering=1024 * 1024) as file:
+        file.write(report_head)
+        if report_mode == "lazy":
+            file.write(lazy_report_script)
+        for h2_content, server_address, grouped_data, id_prefix in sections:
+            if report_mode == "lazy":
+                write_lazy_report_section(file, h2_content, server_address, grouped_data, id_prefix, page_size)
+            else:
+                write_report_section(file, h2_content, server_address, grouped_data, id_prefix)
+        file.write("</body>\n</html>\n")
+
+def summary_columns(sketch):
+    """Return the sample count, mean, peak and p95/p99 traffic (Mbit/s) of a QuantileSketch."""
+    return {
+        "Samples": sketch.count,
+        "Mean": round(sketch.mean(), 2),
+        "Peak": sketch.max if sketch.count else float("nan"),
+        "P95": round(sketch.quantile(0.95), 2),
+        "P99": round(sketch.quantile(0.99), 2)
+    }
+
+def write_summary(summary_path, sketches, rows, total_row):
+    """Write per-row summaries plus a total row merged from every sketch, and the sketches beside them.
+
+    rows are dicts of identifying columns, one per sketch, and total_row the
+    identifying columns of the total. The sketches are
+    also saved as JSON (same name, -sketches.json) so they can be merged again
+    later, e.g. across servers.
+    """
+    total = QuantileSketch(sketches[0].relative_accuracy if sketches else 0.01)
+    for sketch in sketches:
+        total.merge(sketch)
+    summary_df = pd.DataFrame([{**row, **summary_columns(sketch)} for row, sketch in zip(rows, sketches)] +
+                              [{**total_row, **summary_columns(total)}])
+    summary_df.to_csv(summary_path, index=False)
+
+    with open(summary_path[:-len(".csv")] + "-sketches.json", "w") as file:
+        json.dump({"total": total.to_dict(), "rows": [sketch.to_dict() for sketch in sketches]}, file)
+    print(f"Summary has been saved to {summary_path}")
+
+def load_server_parameters(path):
+    """Return the key=value pairs of a server profile, plus its name (server_address-<profile>.txt) as "profile"."""
+    with open(path, "r") as file:
+        server_parameters = dict(line.strip().split("=") for line in file)
+    name = os.path.basename(path)
+    if name.startswith("server_address-") and name.endswith(".txt"):
+        server_parameters.setdefault("profile", name[len("server_address-"):-len(".txt")])
+    return server_parameters
+
+def read_flags():
+    """Return (flags, sensor IDs) from min_max_flags.txt."""
+    flags = {}
+    id_prefix = 'id'
+    id_values = []
+
+    with open("min_max_flags.txt", "r") as file:
+        for line in file:
+            line = line.strip()
+            if "=" in line:
+                key, value = line.split("=")
+                if key.startswith(id_prefix):
+                    id_values.append(value)
+                else:
+                    flags[key] = value
+
+    return flags, id_values
+
+def run_server(server_parameters, shared_parse_executor=None, open_browser=True, state=None, window=None, metrics=None):
+    """Run the whole breach report for one PRTG server.
+
+    Everything the run keeps (HTTP session, caches, worker pools) belongs to
+    this call, so several servers can run side by side. shared_parse_executor,
+    if given, is used for CSV parsing instead of a pool of the run's own.
+
+    state, if given, is a dict carried from one run to the next for the same
+    server (see run_daemon): the session, the sensortree (refreshed every
+    sensortree_refresh_minutes), upper warning limits and caches stay warm in
+    it. window, if given, is an (sdate, edate) pair used instead of the one in
+    min_max_flags.txt. metrics, if given, is a RunMetrics that receives the
+    run's per-stage timings, HTTP latencies and counters; with run_report=yes
+    they are also saved next to the CSV as <csv>-run.json. Returns (CSV path,
+    report heading).
+    """
+    if state is None:
+        state = {}
+    if metrics is None:
+        metrics = RunMetrics()
+
+    server_address = server_parameters.get("server")
+    username = server_parameters.get("username")
+    passhash = server_parameters.get("passhash")
+    param = server_parameters.get("day")
+
+    # Output, archive, cache and cassette files are named after the profile, so
+    # profiles running side by side never share a path, even for the same host
+    profile = server_parameters.get("profile") or server_address.replace(":", "_")
+
+    # scheme=http is only meant for local stand-ins such as prtg_simulator.py
+    scheme = server_parameters.get("scheme", "https")
+    prtg_url = f"{scheme}://{server_address}"
+
+    # Number of PRTG calls allowed in flight at once against this server
+    max_in_flight = int(server_parameters.get("max_in_flight", 8))
+
+    # One keep-alive session for every PRTG endpoint, with a connection pool sized
+    # to max_in_flight so the worker pools reuse TLS connections instead of
+    # opening a new one per call.
+    session = state.get("session")
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        session.mount(f"{scheme}://", HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight))
+        state["session"] = session
+
+    def transport_adapter():
+        """Return the adapter that talks to PRTG (or the cassette), under any throttling."""
+        prtg_adapter = session.get_adapter(f"{scheme}://")
+        return prtg_adapter.adapter if isinstance(prtg_adapter, ThrottledAdapter) else prtg_adapter
+
+    def connection_stats():
+        """Return (connections opened, requests made) across the session's pools."""
+        prtg_adapter = transport_adapter()
+        if isinstance(prtg_adapter, ReplayAdapter):
+            return 0, prtg_adapter.num_requests
+        pool_manager = prtg_adapter.poolmanager
+        pools = [pool_manager.pools[key] for key in pool_manager.pools.keys()]
+        return sum(pool.num_connections for pool in pools), sum(pool.num_requests for pool in pools)
+
+
+    metrics.request_counter = lambda: connection_stats()[1]
+    # Replaces the hook of the previous run when the session is kept in state
+    session.hooks["response"] = [metrics.record_response]
+
+    current_datetime = datetime.now().strftime("%d %B %Y %I:%M %p")
+
+    if server_address and "99-102" in server_address:
+        h2_content = f"Prtg-99-102-Logs-{current_datetime}"
+    elif server_address and "101-100" in server_address:
+         h2_content = f"Prtg-101-100 Logs-{current_datetime}"
+    elif server_address and "99-100" in server_address:
+        h2_content = f"Prtg-99-100 Logs-{current_datetime}"
+    else:
+        h2_content ="PRTG LOGS"
+
+    current_datetime = datetime.now().strftime("%d_%B_%Y_%I_%M_%p")
+
+    file_path = f"prtg-{current_datetime}-{profile}.xml"
+    output_file = f"prtg-{current_datetime}-{profile}.txt"
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    flags, id_values = read_flags()
+    if window is not None:
+        flags["sdate"], flags["edate"] = window
+
+    # cassette_mode=record saves every PRTG response of the run, without
+    # credentials, to cassette_dir/<server>.zip; cassette_mode=replay serves the
+    # run from that file instead of the server, at full speed or, with
+    # replay_timing=original, as slowly as the recorded responses came in.
+    cassette_mode = flags.get("cassette_mode", "off")
+    cassette = state.get("cassette")
+    if cassette is None and cassette_mode in ("record", "replay"):
+        cassette = Cassette(os.path.join(flags.get("cassette_dir", "cassettes"), f"{profile}.zip"))
+        if cassette_mode == "replay":
+            cassette.load()
+            session.mount(f"{scheme}://", ReplayAdapter(cassette, flags.get("replay_timing", "fast") == "original"))
+            print(f"Replaying {cassette.path} ({cassette.stats()})")
+        else:
+            session.mount(f"{scheme}://", RecordingAdapter(cassette, pool_connections=1, pool_maxsize=max_in_flight))
+        state["cassette"] = cassette
+
+    # throttle=adaptive sends every call through a ThrottledAdapter: the calls
+    # in flight adapt (AIMD) between 1 and max_in_flight to PRTG's latency and
+    # errors, failed GETs are retried with jittered backoff, and after
+    # circuit_failures failures in a row the server is left alone for
+    # circuit_open_seconds. The adapter stays in the session, so a daemon keeps
+    # what it learned about the server from one run to the next.
+    # request_timeout_seconds=0 (the default) leaves calls without a timeout,
+    # as PRTG can take minutes to build a long historicdata.csv; with a timeout
+    # set, a historicdata.csv call that times out reading is not retried, since
+    # PRTG is most likely still building the first one.
+    throttled = session.get_adapter(f"{scheme}://")
+    if flags.get("throttle", "adaptive") == "adaptive" and not isinstance(throttled, ThrottledAdapter):
+        throttled = ThrottledAdapter(throttled,
+                                     AdaptiveLimiter(max_in_flight, max(1, max_in_flight // 2), float(flags.get("latency_tolerance", 3))),
+                                     CircuitBreaker(int(flags.get("circuit_failures", 5)), float(flags.get("circuit_open_seconds", 30))),
+                                     int(flags.get("retries", 3)), float(flags.get("retry_backoff_seconds", 0.5)),
+                                     float(flags.get("retry_backoff_max_seconds", 30)), float(flags.get("request_timeout_seconds", 0)) or None)
+        session.mount(f"{scheme}://", throttled)
+    throttle_stats_before = throttled.stats() if isinstance(throttled, ThrottledAdapter) else None
+    # The session outlives the run in daemon mode, so its counts are reported as differences
+    connections_before, requests_before = connection_stats()
+
+    metrics.start("sensortree")
+
+    # The sensortree is only downloaded again once it is sensortree_refresh_minutes
+    # old; until then a run with warm state reuses the sensors found last time.
+    sensortree = state.get("sensortree")
+    refresh_sensortree = sensortree is None or time.time() - sensortree["time"] > float(flags.get("sensortree_refresh_minutes", 60)) * 60
+
+    if refresh_sensortree:
+        # The sensortree XML and the idN= TXT list are only kept as an archive when
+        # asked for. They are written by a single background thread, in order, so the
+        # discovery stage never waits on the disk.
+        archive_sensortree = flags.get("archive_sensortree", "no") == "yes"
+        archive_executor = ThreadPoolExecutor(max_workers=1) if archive_sensortree else None
+
+        if archive_sensortree:
+            print(f"File path to save XML: {file_path}")
+
+        api_endpoint = f'{prtg_url}/api/table.xml?content=sensortree&username={username}&passhash={passhash}'
+
+        response = session.get(api_endpoint, stream=True)
+
+        # Define sensor IDs
+        sensor_ids = []
+
+        # Sensor ID -> device/sensor names taken from the sensortree, so the later
+        # stages don't need a getsensordetails.json call per sensor
+        sensor_metadata = {}
+
+        # Check if the request was successful
+        if response.status_code == 200:
+            print("Request successful!")
+
+            archive = None
+            if archive_sensortree:
+                xml_archive = open(file_path, "w")
+                archive = lambda text: archive_executor.submit(xml_archive.write, text)
+
+            try:
+                for sensor in iter_sensortree(response, archive):
+                    if sensor["sensortype"] == 'SNMP Traffic' and sensor["id"] is not None:
+                        sensor_ids.append(sensor["id"])
+                        sensor_metadata[sensor["id"]] = {
+                            "device_name": sensor["device_name"],
+                            "device_id": sensor["device_id"],
+                            "sensor_name": sensor["sensor_name"],
+                            "probe": sensor["probe"],
+                            "group": sensor["group"]
+                        }
+            except ET.ParseError as e:
+                print("Error parsing XML:", e)
+
+            if archive_sensortree:
+                archive_executor.submit(xml_archive.close)
+        else:
+            print(f"Error: {response.status_code} - {response.text}")
+
+        def write_sensor_id_archive(sensor_ids):
+            with open(output_file, 'w') as file:
+                for i, sensor_id in enumerate(sensor_ids, start=1):
+                    file.write(f"id{i}={sensor_id}\n")
+            print("Sensor IDs for SNMP Traffic sensors have been saved to:", output_file)
+
+        if archive_sensortree:
+            archive_executor.submit(write_sensor_id_archive, sensor_ids)
+            # Queued writes still finish before the interpreter exits
+            archive_executor.shutdown(wait=False)
+
+        if response.status_code == 200:
+            state["sensortree"] = {"time": time.time(), "sensor_ids": sensor_ids, "sensor_metadata": sensor_metadata}
+            # Limits are refetched along with the sensortree
+            state.pop("limits", None)
+    else:
+        sensor_ids = list(sensortree["sensor_ids"])
+        sensor_metadata = sensortree["sensor_metadata"]
+        print(f"Reusing the sensortree from {(time.time() - sensortree['time']) / 60:.0f} minutes ago ({len(sensor_ids)} SNMP Traffic sensors)")
+
+    # Sensor IDs go straight to the evaluation stage, after any IDs listed in min_max_flags.txt
+    id_values.extend(sensor_ids)
+
+    metrics.start("limits")
+    metrics.count("sensors", len(id_values))
+
+    # Limits and getsensordetails answers can be kept between runs
+    # (info_cache=yes). Entries expire after info_cache_ttl_hours, and a sensor
+    # whose sensortree record changed since they were stored is refetched.
+    sensor_info_cache = state.get("sensor_info_cache")
+    if sensor_info_cache is None and flags.get("info_cache", "no") == "yes":
+        sensor_info_cache = SensorInfoCache(os.path.join(flags.get("cache_dir", "cache"), f"sensor-info-{profile}.json"),
+                                            float(flags.get("info_cache_ttl_hours", 24)) * 3600)
+        state["sensor_info_cache"] = sensor_info_cache
+    if sensor_info_cache is not None and refresh_sensortree:
+        invalidated = sensor_info_cache.invalidate_changed({sensor_id: fingerprint(metadata) for sensor_id, metadata in sensor_metadata.items()})
+        print(f"Sensor info cache: {invalidated} sensors changed in the sensortree since the last run")
+
+    upper_warning_limits = {}
+
+    def fetch_upper_warning_limit(id_value):
+        # Runs inside the worker pool, so messages are handed back to the caller
+        # instead of being printed here and interleaving with the progress bar.
+        # The last value says whether PRTG gave an answer (a limit or "not
+        # set") worth caching, as opposed to an error.
+        try:
+            api_endpoint_upper_warning = f'{prtg_url}/api/getobjectproperty.htm?subtype=channel&id={id_value}&subid=-1&name=limitmaxwarning&show=nohtmlencode&username={username}&passhash={passhash}'
+            response_upper_warning = session.get(api_endpoint_upper_warning)
+
+            if response_upper_warning.status_code != 200:
+                return id_value, None, f"Check parameters for: {id_value}", False
+
+            match_upper_warning = re.search(r'<result>(\d+)</result>', response_upper_warning.text)
+
+            if match_upper_warning is not None:
+                return id_value, float(match_upper_warning.group(1)) * 8 / 1000000, None, True
+            else:
+                return id_value, None, f"Warning: Upper warning limit value not set for ID: {id_value}. Skipping.", True
+        except Exception as e:
+            return id_value, None, f"Error getting upper warning limit for ID {id_value}: {e}", False
+
+    def fetch_bulk_upper_warning_limits():
+        """Page through a channel table and return ({sensor ID: upper warning limit}, calls made).
+
+        Only the Traffic Total channel (objid -1, the same subid the per-sensor
+        lookup asks for) is used. Rows without a numeric limit are left out so the
+        caller can fall back to getobjectproperty for them.
+        """
+        bulk_limits = {}
+        bulk_calls = 0
+        page_size = int(flags.get("limit_page_size", 5000))
+        start = 0
+
+        while True:
+            api_endpoint_bulk = f'{prtg_url}/api/table.xml?content=channels&columns=objid,parentid,name,limitmaxwarning&count={page_size}&start={start}&username={username}&passhash={passhash}'
+            response_bulk = session.get(api_endpoint_bulk)
+            bulk_calls += 1
+
+            if response_bulk.status_code != 200:
+                print(f"Bulk limit query failed with status {response_bulk.status_code}, falling back to per-sensor lookups")
+                break
+
+            try:
+                bulk_root = ET.fromstring(''.join(iter_cleaned_text(response_bulk)))
+            except ET.ParseError as e:
+                print("Error parsing bulk limit table:", e)
+                break
+
+            items = bulk_root.findall('item')
+            for item in items:
+                if item.findtext('objid') != '-1':
+                    continue
+                limit_text = item.findtext('limitmaxwarning_raw') or item.findtext('limitmaxwarning') or ''
+                match_upper_warning = re.fullmatch(r'\d+', limit_text.replace(',', '').strip())
+                if match_upper_warning is not None:
+                    bulk_limits[item.findtext('parentid')] = float(match_upper_warning.group(0)) * 8 / 1000000
+
+            start += len(items)
+            if len(items) < page_size or start >= int(bulk_root.get('totalcount', start)):
+                break
+
+        return bulk_limits, bulk_calls
+
+    # Limits answered in earlier runs with the same warm state, None for "not set"
+    warm_limits = state.setdefault("limits", {})
+
+    # IDs that still need a getobjectproperty call
+    pending_ids = id_values
+
+    if warm_limits:
+        pending_ids = []
+        for id_value in id_values:
+            if id_value not in warm_limits:
+                pending_ids.append(id_value)
+            elif warm_limits[id_value] is not None:
+                upper_warning_limits[id_value] = warm_limits[id_value]
+            else:
+                print(f"Warning: Upper warning limit value not set for ID: {id_value}. Skipping.")
+        print(f"Warm state: {len(id_values) - len(pending_ids)} limits kept from the last run, {len(pending_ids)} to look up")
+
+    if sensor_info_cache is not None:
+        uncached_ids = []
+        for id_value in pending_ids:
+            found, upper_warning_limit = sensor_info_cache.get(id_value, "limit")
+            if not found:
+                uncached_ids.append(id_value)
+                continue
+            warm_limits[id_value] = upper_warning_limit
+            if upper_warning_limit is not None:
+                upper_warning_limits[id_value] = upper_warning_limit
+            else:
+                print(f"Warning: Upper warning limit value not set for ID: {id_value}. Skipping.")
+        print(f"Sensor info cache: {len(pending_ids) - len(uncached_ids)} limits from cache, {len(uncached_ids)} to fetch")
+        pending_ids = uncached_ids
+
+    if flags.get("limit_mode") == "bulk" and pending_ids:
+        bulk_limits, bulk_calls = fetch_bulk_upper_warning_limits()
+        bulk_ids = [id_value for id_value in pending_ids if id_value in bulk_limits]
+        for id_value in bulk_ids:
+            upper_warning_limits[id_value] = bulk_limits[id_value]
+            warm_limits[id_value] = bulk_limits[id_value]
+            if sensor_info_cache is not None:
+                sensor_info_cache.put(id_value, "limit", bulk_limits[id_value])
+        pending_ids = [id_value for id_value in pending_ids if id_value not in bulk_limits]
+        print(f"Bulk limit discovery: {len(bulk_ids)} limits from {bulk_calls} table call(s), "
+              f"{len(pending_ids)} falling back to getobjectproperty, "
+              f"{len(bulk_ids) - bulk_calls} calls saved")
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = [executor.submit(fetch_upper_warning_limit, id_value) for id_value in pending_ids]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Getting upper warning for Each IDs"):
+            id_value, upper_warning_limit, message, answered = future.result()
+            if message:
+                print(message)
+            if upper_warning_limit is not None:
+                upper_warning_limits[id_value] = upper_warning_limit
+            if answered:
+                warm_limits[id_value] = upper_warning_limit
+                if sensor_info_cache is not None:
+                    sensor_info_cache.put(id_value, "limit", upper_warning_limit)
+
+    def get_sensor_details(id_value):
+        """Return (device name, device ID, sensor name) for a sensor, or None if PRTG can't say.
+
+        Sensors found in the sensortree are answered from sensor_metadata; only IDs
+        that aren't in the tree (e.g. extra IDs from min_max_flags.txt) fall back
+        to getsensordetails.json.
+        """
+        if id_value in sensor_metadata:
+            metadata = sensor_metadata[id_value]
+            return metadata["device_name"], metadata["device_id"], metadata["sensor_name"]
+
+        if sensor_info_cache is not None:
+            found, sensor_details = sensor_info_cache.get(id_value, "details")
+            if found:
+                return tuple(sensor_details)
+
+        api_endpoint = f'{prtg_url}/api/getsensordetails.json?id={id_value}&username={username}&passhash={passhash}'
+        response = session.get(api_endpoint)
+
+        if response.status_code != 200:
+            return None
+
+        device_details = response.json().get("sensordata")
+        sensor_details = (device_details.get("parentdevicename", "N/A"),
+                          device_details.get("parentdeviceid", "N/A"),
+                          device_details.get("name", "N/A"))
+        if sensor_info_cache is not None:
+            sensor_info_cache.put(id_value, "details", sensor_details)
+        return sensor_details
+
+    metrics.start("details")
+
+    output_data = []
+
+    # Breach samples are kept as whole DataFrames rather than one dict per row.
+    # output_data rows collected so far are flushed in front of each breach frame
+    # so the CSV keeps the original row order.
+    output_frames = []
+
+    for id_value in id_values:
+        if id_value not in upper_warning_limits:
+            # Fetch device details for IDs without upper warning limits
+            try:
+                sensor_details = get_sensor_details(id_value)
+
+                if sensor_details is not None:
+                    parent_device_name, DeviceID, sensor_device_name = sensor_details
+
+                    output_data.append({
+                        "Device Name": parent_device_name,
+                        "Device ID": DeviceID,
+                        "Sensor Name": sensor_device_name,
+                        "Sensor ID": id_value,
+                        "Date": "NA",
+                        "Message":"Upper Warning Limit Not Set",
+                        "Traffic Total": "N/A"
+                    })
+                else:
+                    print(f"Error: Unable to get device details for ID: {id_value}")
+            except Exception as e:
+                print(f"Error fetching device details for ID {id_value}: {e}")
+
+    metrics.start("historic")
+
+    # Historic data is downloaded on max_in_flight threads and each raw CSV is
+    # handed to a process pool for parsing and evaluation, so downloads and pandas
+    # work overlap and use every core. parse_workers sets the pool size (empty
+    # for one per core); parse_workers=0 parses on the download threads instead.
+    parse_workers = int(flags.get("parse_workers") or os.cpu_count() or 1)
+    if shared_parse_executor is not None:
+        parse_executor = shared_parse_executor
+    else:
+        parse_executor = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+
+    # Caps the raw CSVs held in memory between download and parse
+    historic_slots = threading.BoundedSemaphore(max_in_flight + max(parse_workers, 1) * 2)
+
+    # historicdata.csv bodies can be cached on disk. With cache=yes whole
+    # responses are keyed by server, sensor, avg and window: a window that ends
+    # in the past never changes, one that reaches "now" is only reused for
+    # cache_max_age seconds. With cache=segments the samples are stored per
+    # segment_minutes segment instead, so overlapping windows share segments
+    # and only the missing ones (plus the partial ends) are downloaded. A
+    # segment is only cached once it ended segment_settle_seconds ago, so PRTG
+    # has stored its last scans. Segments are only used when avg divides the
+    # segment length and sdate sits on an avg boundary from the segment origin;
+    # otherwise they would bucket samples differently than one query over the
+    # window would.
+    cache_mode = flags.get("cache", "no")
+    historic_cache = None
+    historic_cache_max_age = None
+    if cache_mode in ("yes", "segments"):
+        historic_cache = state.get("historic_cache")
+        if historic_cache is None:
+            historic_cache = ResponseCache(flags.get("cache_dir", "cache"), float(flags.get("cache_max_mb", 500)) * 1000000)
+            state["historic_cache"] = historic_cache
+        if datetime.strptime(flags.get("edate"), "%Y-%m-%d-%H-%M-%S") >= datetime.now():
+            historic_cache_max_age = float(flags.get("cache_max_age", 300))
+    segment_seconds = float(flags.get("segment_minutes", 60)) * 60
+    segment_settle_seconds = float(flags.get("segment_settle_seconds", 300))
+
+    # Long windows are split into chunks of at most chunk_rows samples, fetched
+    # in parallel and joined back in order. With avg=0 the sample spacing is
+    # the sensor's scanning interval, taken as raw_interval_seconds.
+    historic_row_budget = int(flags.get("chunk_rows", 50000))
+    raw_interval_seconds = float(flags.get("raw_interval_seconds", 60))
+    # Chunks get their own pool: the historic threads wait on them
+    chunk_executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def chunk_seconds_for(avg):
+        interval = float(avg) if avg and float(avg) > 0 else raw_interval_seconds
+        return historic_row_budget * interval
+
+    def download_historic_csv(id_value, avg, sdate, edate):
+        api_endpoint = f'{prtg_url}/api/historicdata.csv?id={id_value}&avg={avg}&sdate={sdate}&edate={edate}&username={username}&passhash={passhash}'
+        return session.get(api_endpoint)
+
+    def download_historic_ranges(id_value, avg, ranges):
+        """Download each (start, end) range as row-budget chunks, all in parallel.
+
+        Returns ([(header, row lists, failed chunks)] in range order, (calls
+        made, bytes downloaded)), failed chunks describing each chunk of the
+        range that came back without data; see check_complete.
+        """
+        chunk_futures = [[(chunk_start, chunk_end, chunk_executor.submit(download_historic_csv, id_value, avg,
+                                                                         chunk_start.strftime("%Y-%m-%d-%H-%M-%S"), chunk_end.strftime("%Y-%m-%d-%H-%M-%S")))
+                          for chunk_start, chunk_end in split_window(start, end, chunk_seconds_for(avg))]
+                         for start, end in ranges]
+        results = []
+        calls = 0
+        downloaded = 0
+        for futures in chunk_futures:
+            header = None
+            pieces = []
+            failed = []
+            for chunk_start, chunk_end, future in futures:
+                response = future.result()
+                calls += 1
+                downloaded += len(response.content)
+                chunk_header, rows = split_historic_csv(response.content, response.encoding) if response.status_code == 200 else (None, [])
+                if chunk_header is None:
+                    failed.append(f"{chunk_start:%Y-%m-%d %H:%M:%S} to {chunk_end:%Y-%m-%d %H:%M:%S} "
+                                  f"({'HTTP ' + str(response.status_code) if response.status_code != 200 else 'no CSV header'})")
+                    continue
+                header = header or chunk_header
+                pieces.append(rows)
+            results.append((header, pieces, failed))
+        return results, (calls, downloaded)
+
+    def check_complete(failed):
+        """Fail the sensor when part of its window is missing, rather than evaluate the rest as if it were all."""
+        if failed:
+            raise RuntimeError(f"{len(failed)} part(s) of the window could not be downloaded, first {failed[0]}")
+
+    def fetch_historic_segments(id_value, avg):
+        """Assemble the configured window from cached segments, downloading only what's missing.
+
+        Returns (content, encoding, calls made, bytes downloaded).
+        """
+        plan = plan_historic_pieces(datetime.strptime(flags.get("sdate"), "%Y-%m-%d-%H-%M-%S"),
+                                    datetime.strptime(flags.get("edate"), "%Y-%m-%d-%H-%M-%S"),
+                                    segment_seconds, datetime.now(), segment_settle_seconds)
+        # Per piece: (header, row lists) once known, None while still to download
+        assembled = []
+        missing = []
+        for start, end, cacheable in plan:
+            segment_key = ("segment", server_address, id_value, avg, start.strftime("%Y-%m-%d-%H-%M-%S"), end.strftime("%Y-%m-%d-%H-%M-%S"))
+            cached = historic_cache.get(segment_key) if cacheable else None
+            if cached is not None:
+                piece_header, rows = split_historic_csv(*cached)
+                assembled.append((piece_header, [rows]))
+            else:
+                assembled.append(None)
+                missing.append((len(assembled) - 1, start, end, cacheable, segment_key))
+
+        results, (calls, downloaded) = download_historic_ranges(id_value, avg, [(start, end) for _, start, end, _, _ in missing])
+        for (index, _, _, cacheable, segment_key), (piece_header, pieces, failed) in zip(missing, results):
+            assembled[index] = (piece_header, pieces)
+            if cacheable and not failed and piece_header is not None:
+                historic_cache.put(segment_key, join_historic_csv(piece_header, pieces), 'utf-8')
+        # Segments that did arrive stay cached for the next run
+        check_complete([description for _, _, failed in results for description in failed])
+
+        header = next((piece_header for piece_header, _ in assembled if piece_header is not None), None)
+        if header is None:
+            return b'', 'utf-8', calls, downloaded
+        return join_historic_csv(header, [rows for piece_header, pieces in assembled if piece_header is not None for rows in pieces]), 'utf-8', calls, downloaded
+
+    def fetch_historic_csv(id_value, avg):
+        """Return (content, encoding, calls made, bytes downloaded) for the configured window."""
+        sdate_offset = (datetime.strptime(flags.get("sdate"), "%Y-%m-%d-%H-%M-%S") - segment_origin).total_seconds()
+        if cache_mode == "segments" and (float(avg or 0) <= 0 or (segment_seconds % float(avg) == 0 and sdate_offset % float(avg) == 0)):
+            return fetch_historic_segments(id_value, avg)
+
+        cache_key = (server_address, id_value, avg, flags.get("sdate"), flags.get("edate"))
+        cached = historic_cache.get(cache_key, historic_cache_max_age) if historic_cache is not None else None
+        if cached is not None:
+            content, encoding = cached
+            return content, encoding, 0, 0
+
+        sdate = datetime.strptime(flags.get("sdate"), "%Y-%m-%d-%H-%M-%S")
+        edate = datetime.strptime(flags.get("edate"), "%Y-%m-%d-%H-%M-%S")
+        if len(split_window(sdate, edate, chunk_seconds_for(avg))) > 1:
+            [(header, pieces, failed)], (calls, downloaded) = download_historic_ranges(id_value, avg, [(sdate, edate)])
+            check_complete(failed)
+            content = join_historic_csv(header, pieces)
+            if historic_cache is not None:
+                historic_cache.put(cache_key, content, 'utf-8')
+            return content, 'utf-8', calls, downloaded
+
+        response = download_historic_csv(id_value, avg, flags.get("sdate"), flags.get("edate"))
+        if historic_cache is not None and response.status_code == 200:
+            historic_cache.put(cache_key, response.content, response.encoding)
+        return response.content, response.encoding, 1, len(response.content)
+
+    # breach_output=intervals reports each run of consecutive samples above the
+    # limit as one row (first and last sample, duration, peak, mean, sample
+    # count) instead of one row per sample
+    breach_intervals = flags.get("breach_output", "samples") == "intervals"
+
+    # summary=yes also reports each sensor's mean, peak and p95/p99 traffic. The
+    # parse workers hand back a QuantileSketch (accurate to summary_accuracy)
+    # rather than the samples, and the sketches merge into a server total.
+    summary = flags.get("summary", "no") == "yes"
+    sketch_accuracy = float(flags.get("summary_accuracy", 0.01)) if summary else None
+    summary_rows = []
+    summary_sketches = []
+
+    def fetch_and_evaluate_historic_data(id_value, avg):
+        """Fetch one sensor's history at the given averaging and queue it for evaluation.
+
+        Returns the evaluation future and (calls made, bytes downloaded).
+        """
+        historic_slots.acquire()
+        try:
+            started = time.perf_counter()
+            content, encoding, calls, downloaded = fetch_historic_csv(id_value, avg)
+            metrics.record_sensor(id_value, download_seconds=time.perf_counter() - started, calls=calls, bytes=downloaded)
+
+            if parse_executor is None:
+                parse_future = Future()
+                parse_future.set_result(evaluate_historic_csv(content, upper_warning_limits[id_value], encoding, breach_intervals, sketch_accuracy))
+            else:
+                parse_future = parse_executor.submit(evaluate_historic_csv, content, upper_warning_limits[id_value], encoding, breach_intervals, sketch_accuracy)
+        except BaseException:
+            historic_slots.release()
+            raise
+        parse_future.add_done_callback(lambda _: historic_slots.release())
+        return parse_future, (calls, downloaded)
+
+    # Coarse-to-fine screening: with screening=yes each sensor is first fetched
+    # at screening_avg seconds. Only sensors whose coarse peak reaches
+    # screening_margin x their limit are fetched again at the configured avg;
+    # the rest are reported from the coarse peak.
+    screening = flags.get("screening", "no") == "yes"
+    screening_avg = flags.get("screening_avg", "3600")
+    screening_margin = float(flags.get("screening_margin", 0.8))
+
+    def screen_and_evaluate_historic_data(id_value):
+        """Return the sensor's historic summary and {phase: (calls, bytes)} for the downloads it took."""
+        historic_calls = {}
+
+        if screening:
+            parse_future, historic_calls["coarse"] = fetch_and_evaluate_historic_data(id_value, screening_avg)
+            coarse_summary = parse_future.result()
+            if coarse_summary is None or (coarse_summary["dates"] is None and coarse_summary["max_traffic"] < upper_warning_limits[id_value] * screening_margin):
+                return coarse_summary, historic_calls
+            metrics.count("parse_cpu_seconds", coarse_summary["parse_seconds"])
+            metrics.record_sensor(id_value, parse_seconds=coarse_summary["parse_seconds"])
+
+        parse_future, historic_calls["fine"] = fetch_and_evaluate_historic_data(id_value, flags.get("avg"))
+        return parse_future.result(), historic_calls
+
+    # Sensors without an upper warning limit were already reported above
+    historic_ids = [id_value for id_value in id_values if id_value in upper_warning_limits]
+
+    # Calls, bytes and sensors per download phase, for the summary at the end
+    # of the stage (a sensor can take several calls with chunking or segments)
+    historic_totals = {"coarse": [0, 0, 0], "fine": [0, 0, 0]}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as historic_executor:
+        historic_futures = {id_value: historic_executor.submit(screen_and_evaluate_historic_data, id_value) for id_value in historic_ids}
+
+        for id_value in tqdm(historic_ids, desc="Processing IDs"):
+            parent_device_name = "N/A"
+            sensor_device_name = "N/A"
+            DeviceID = "N/A"
+
+            try:
+                historic_summary, historic_calls = historic_futures.pop(id_value).result()
+                for phase, (calls, size) in historic_calls.items():
+                    historic_totals[phase][0] += calls
+                    historic_totals[phase][1] += size
+                    historic_totals[phase][2] += 1
+            except Exception as e:
+                print(f"Error processing historic data for ID {id_value}: {e}")
+                continue
+
+            if historic_summary is None:
+                print(f"Traffic Total (Speed) column not found for ID: {id_value}")
+                continue
+            metrics.count("historic_rows", historic_summary["samples"])
+            metrics.count("parse_cpu_seconds", historic_summary["parse_seconds"])
+            metrics.record_sensor(id_value, parse_seconds=historic_summary["parse_seconds"], samples=historic_summary["samples"])
+
+            try:
+                # Fetch sensor details
+                sensor_details = get_sensor_details(id_value)
+
+                if sensor_details is not None:
+                    parent_device_name, DeviceID, sensor_device_name = sensor_details
+                else:
+                    print(f"Error: Unable to get device details for ID: {id_value}")
+            except Exception as e:
+                print(f"Error fetching device details for ID {id_value}: {e}")
+                continue
+
+            if summary:
+                summary_rows.append({
+                    "Device Name": parent_device_name,
+                    "Device ID": DeviceID,
+                    "Sensor Name": sensor_device_name,
+                    "Sensor ID": id_value,
+                    # Sensors left at the coarse screening pass are summarized at that averaging
+                    "Averaging (s)": flags.get("avg") if "fine" in historic_calls else screening_avg
+                })
+                summary_sketches.append(historic_summary["sketch"])
+
+            # Collect data for output
+            if historic_summary["dates"] is not None:
+                if output_data:
+                    output_frames.append(pd.DataFrame(output_data))
+                    output_data = []
+                breach_frame = pd.DataFrame({
+                    "Device Name": parent_device_name,
+                    "Device ID": DeviceID,
+                    "Sensor Name": sensor_device_name,
+                    "Sensor ID": id_value,
+                    "Date": historic_summary["dates"],
+                    "Message": "Traffic total cross upper warning limit",
+                    "Traffic Total": historic_summary["traffic"]
+                })
+                if "end_dates" in historic_summary:
+                    breach_frame["End Date"] = historic_summary["end_dates"]
+                    breach_frame["Duration (s)"] = historic_summary["durations"]
+                    breach_frame["Mean Traffic"] = historic_summary["means"]
+                    breach_frame["Samples"] = historic_summary["counts"]
+                output_frames.append(breach_frame)
+            else:
+                output_data.append({
+                    "Device Name": parent_device_name,
+                    "Device ID": DeviceID,
+                    "Sensor Name": sensor_device_name,
+                    "Sensor ID": id_value,
+                    "Date": historic_summary["max_traffic_date"],
+                    "Message":"Traffic total is under upper warning limit",
+                    "Traffic Total": historic_summary["max_traffic"]
+                })
+
+    chunk_executor.shutdown()
+    if parse_executor is not None and parse_executor is not shared_parse_executor:
+        parse_executor.shutdown()
+
+    if screening:
+        print(f"Screening: {historic_totals['coarse'][0]} coarse calls ({historic_totals['coarse'][1] / 1000000:.1f} MB) at avg={screening_avg}, "
+              f"{historic_totals['fine'][2]} sensors refetched at full resolution in {historic_totals['fine'][0]} calls ({historic_totals['fine'][1] / 1000000:.1f} MB)")
+    else:
+        print(f"Historic data: {historic_totals['fine'][0]} calls ({historic_totals['fine'][1] / 1000000:.1f} MB)")
+
+    if historic_cache is not None:
+        print(f"Historic cache: {historic_cache.stats()}")
+
+    if sensor_info_cache is not None:
+        sensor_info_cache.save()
+
+    metrics.start("csv")
+
+    if output_data or not output_frames:
+        output_frames.append(pd.DataFrame(output_data))
+
+    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    csv_file = f"prtg-{current_datetime}-{profile}.csv"
+
+    # Define the output directory
+    output_directory = "output"
+    os.makedirs(output_directory, exist_ok=True)
+
+    # Generate output file path using csv_file
+    output_file_path = os.path.join(output_directory, csv_file)
+
+    # Create a DataFrame from the collected rows and breach frames
+    output_df = pd.concat(output_frames, ignore_index=True)
+    if "Samples" in output_df.columns:
+        # Rows other than breach intervals leave these empty; keep the rest whole numbers
+        output_df["Duration (s)"] = output_df["Duration (s)"].astype("Int64")
+        output_df["Samples"] = output_df["Samples"].astype("Int64")
+
+    # Save DataFrame to CSV
+    output_df.to_csv(output_file_path, index=False)
+
+    # Print confirmation message
+    print(f"\nOutput has been saved to {output_file_path}")
+
+    if summary:
+        write_summary(output_file_path[:-len(".csv")] + "-summary.csv", summary_sketches, summary_rows, {"Sensor Name": "All sensors"})
+
+    metrics.count("output_rows", len(output_df))
+    metrics.start("grouping")
+    grouped_data = group_report_rows(pd.read_csv(output_file_path))
+    metrics.start("html")
+
+    html_file = f"prtg-{current_datetime}-{profile}.html"
+
+    write_html_report(html_file, [(h2_content, server_address, grouped_data, "")],
+                      flags.get("report_mode", "full"), int(flags.get("report_page_size", 500)))
+    if open_browser:
+        webbrowser.open(html_file)
+
+    print("HTML page generated successfully.")
+    metrics.finish()
+
+    connections_opened, requests_made = connection_stats()
+    connections_opened -= connections_before
+    requests_made -= requests_before
+    print(f"HTTP: {requests_made} requests over {connections_opened} connections")
+    if throttle_stats_before is not None:
+        for name, value in throttled.stats().items():
+            metrics.count(name, value - throttle_stats_before[name])
+        print(f"Throttle: {metrics.counters['retries']} retries, circuit opened {metrics.counters['circuit_opens']} times, "
+              f"concurrency limit now {throttled.limiter.limit:.1f} of {max_in_flight} (lowest {throttled.limiter.lowest_limit:.1f})")
+
+    if flags.get("run_report", "yes") == "yes":
+        run_report_path = output_file_path[:-len(".csv")] + "-run.json"
+        with open(run_report_path, "w") as file:
+            json.dump({"server": server_address, "sdate": flags.get("sdate"), "edate": flags.get("edate"), "avg": flags.get("avg"),
+                       **metrics.to_dict()}, file, indent=2)
+        print(f"Run report has been saved to {run_report_path}")
+
+    if cassette_mode == "record":
+        cassette.save()
+        print(f"Cassette saved to {cassette.path} ({cassette.stats()})")
+    elif cassette_mode == "replay" and transport_adapter().num_missing:
+        print(f"Warning: {transport_adapter().num_missing} requests were not in the cassette")
+
+    return output_file_path, h2_content
+
+def run_all_servers():
+    """Run every server_address-*.txt profile concurrently and add a combined report.
+
+    Each server keeps its own session and max_in_flight limit; only the CSV
+    parsing pool is shared so the machine isn't oversubscribed.
+    """
+    server_files = sorted(glob.glob("server_address-*.txt"))
+    flags, _ = read_flags()
+    parse_workers = int(flags.get("parse_workers") or os.cpu_count() or 1)
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(server_files)) as server_executor:
+        futures = {server_file: server_executor.submit(run_server, load_server_parameters(server_file), parse_executor, False)
+                   for server_file in server_files}
+        for server_file, future in futures.items():
+            try:
+                results[server_file] = future.result()
+            except Exception as e:
+                print(f"Error running {server_file}: {e}")
+
+    if parse_executor is not None:
+        parse_executor.shutdown()
+
+    if not results:
+        return
+
+    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    combined_frames = []
+    sections = []
+    for index, (server_file, (output_file_path, h2_content)) in enumerate(results.items()):
+        sections.append((h2_content, load_server_parameters(server_file).get("server"), group_report_rows(pd.read_csv(output_file_path)), f"s{index}_"))
+        # Read as plain text so the combined CSV keeps values like "N/A" as written
+        server_df = pd.read_csv(output_file_path, dtype=str, keep_default_na=False)
+        server_df.insert(0, "Server", server_file[len("server_address-"):-len(".txt")])
+        combined_frames.append(server_df)
+
+    combined_csv = os.path.join("output", f"prtg-{current_datetime}-combined.csv")
+    pd.concat(combined_frames, ignore_index=True).to_csv(combined_csv, index=False)
+    print(f"\nCombined output has been saved to {combined_csv}")
+
+    if flags.get("summary", "no") == "yes":
+        # One row per server, merged from each server's total sketch
+        server_sketches = []
+        server_rows = []
+        for server_file, (output_file_path, _) in results.items():
+            try:
+                with open(output_file_path[:-len(".csv")] + "-summary-sketches.json", "r") as file:
+                    server_sketches.append(QuantileSketch.from_dict(json.load(file)["total"]))
+            except OSError as e:
+                print(f"Error reading the summary of {server_file}: {e}")
+                continue
+            server_rows.append({"Server": server_file[len("server_address-"):-len(".txt")]})
+        write_summary(os.path.join("output", f"prtg-{current_datetime}-combined-summary.csv"), server_sketches, server_rows, {"Server": "All servers"})
+
+    combined_html = f"prtg-{current_datetime}-combined.html"
+    write_html_report(combined_html, sections, flags.get("report_mode", "full"), int(flags.get("report_page_size", 500)))
+    webbrowser.open(combined_html)
+    print("Combined HTML page generated successfully.")
+
+def run_server_on_schedule(server_file, parse_executor, stop):
+    """Run one server profile on its schedule until stop is set, keeping its state warm."""
+    server_parameters = load_server_parameters(server_file)
+    flags, _ = read_flags()
+    # A server file can override the schedule settings from min_max_flags.txt
+    schedule = parse_schedule(server_parameters.get("schedule", flags.get("schedule", "15m")))
+    jitter = float(server_parameters.get("schedule_jitter_seconds", flags.get("schedule_jitter_seconds", 30)))
+    state = {}
+
+    next_run = schedule.next_after(datetime.now())
+    while True:
+        # Random jitter per server and cycle keeps servers sharing a schedule
+        # from hitting their PRTGs at the same instant
+        delay = max((next_run - datetime.now()).total_seconds(), 0) + random.uniform(0, jitter)
+        print(f"{server_file}: next run at {(datetime.now() + timedelta(seconds=delay)).strftime('%Y-%m-%d %H:%M:%S')}")
+        if stop.wait(delay):
+            return
+
+        flags, _ = read_flags()
+        window = None
+        window_minutes = float(flags.get("daemon_window_minutes", 0))
+        if window_minutes > 0:
+            edate = datetime.now().replace(microsecond=0)
+            window = ((edate - timedelta(minutes=window_minutes)).strftime("%Y-%m-%d-%H-%M-%S"), edate.strftime("%Y-%m-%d-%H-%M-%S"))
+
+        try:
+            run_server(server_parameters, parse_executor, False, state, window)
+        except Exception as e:
+            print(f"Error running {server_file}: {e}")
+
+        # A run that overran its slot is followed by the next slot after it
+        # ends rather than by a burst of catch-up runs
+        next_run = schedule.next_after(max(next_run, datetime.now()))
+
+def run_daemon():
+    """Keep running every server_address-*.txt profile on its schedule until interrupted.
+
+    The process stays resident, so imports, the HTTP session, the sensortree,
+    upper warning limits and caches are reused from one cycle to the next
+    instead of being rebuilt by a cron job every time.
+    """
+    server_files = sorted(glob.glob("server_address-*.txt"))
+    flags, _ = read_flags()
+    parse_workers = int(flags.get("parse_workers") or os.cpu_count() or 1)
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers, initializer=ignore_interrupts) if parse_workers > 0 else None
+
+    stop = threading.Event()
+    # A service manager stops the daemon with SIGTERM; treat it like Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    threads = [threading.Thread(target=run_server_on_schedule, args=(server_file, parse_executor, stop), name=server_file)
+               for server_file in server_files]
+    for thread in threads:
+        thread.start()
+
+    # Polled rather than joined: an interrupted Thread.join can leave the
+    # thread looking finished while its run is still going
+    try:
+        while not stop.is_set() and any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping after the runs in progress finish...")
+        stop.set()
+    for thread in threads:
+        thread.join()
+
+    if parse_executor is not None:
+        parse_executor.shutdown()
+
+if __name__ == "__main__":
+    # The choice can also be given on the command line, e.g. to start the
+    # daemon from a service manager
+    if len(sys.argv) > 1:
+        prtg_choice = sys.argv[1]
+    else:
+        prtg_choice = input("Enter the PRTG you want (99.100, 101.100, 99.102, all, daemon): ")
+
+    if prtg_choice == "99.100":
+        run_server(load_server_parameters("server_address-99.100.txt"))
+    elif prtg_choice == "101.100":
+        run_server(load_server_parameters("server_address-101.100.txt"))
+    elif prtg_choice == "99.102":
+        run_server(load_server_parameters("server_address-99.102.txt"))
+    elif prtg_choice == "all":
+        run_all_servers()
+    elif prtg_choice == "daemon":
+        run_daemon()
+    else:
+        print("Invalid input! Please enter either '99.100', '101.100', '99.102', 'all' or 'daemon'.")
+        exit()
@@ -0,0 +1,227 @@
+# End-to-end benchmark of BreachCombineComplete.py.
+#
+# Every scenario runs the full pipeline (sensortree, limits, details, historic
+# fetch and evaluation, CSV, grouping, HTML) in a fresh Python process and a
+# scratch directory, against prtg_simulator.py started for that scenario or
+# against a recorded cassette (cassette_mode=replay). Results go to a JSON file
+# so runs can be compared:
+#
+#   python benchmark_prtg.py                                  # 100/1k/10k/50k sensors x 1h/1d/7d raw windows
+#   python benchmark_prtg.py --sensors 100,1000 --windows 1h  # a quicker subset
+#   python benchmark_prtg.py --cassette cassettes/99.102.zip \
+#       --server-file server_address-99.102.txt                # replay a recorded run
+#
+# The full matrix downloads billions of simulated samples; expect it to take hours.
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+repo_directory = os.path.dirname(os.path.abspath(__file__))
+
+# Windows end at a fixed moment so every run asks for the same samples
+window_end = datetime(2024, 8, 8, 0, 0, 0)
+
+
+def parse_window(text):
+    match = re.fullmatch(r'(\d+)([hd])', text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"window must look like 1h or 7d, got {text!r}")
+    return timedelta(hours=int(match.group(1)) * (24 if match.group(2) == "d" else 1))
+
+
+def write_flags(path, overrides):
+    """Copy the repo's min_max_flags.txt to path with the given keys replaced (or added)."""
+    with open(os.path.join(repo_directory, "min_max_flags.txt"), "r") as file:
+        lines = file.read().splitlines()
+    remaining = dict(overrides)
+    for index, line in enumerate(lines):
+        key = line.split("=")[0].strip()
+        if "=" in line and key in remaining:
+            lines[index] = f"{key}={remaining.pop(key)}"
+    lines += [f"{key}={value}" for key, value in remaining.items()]
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Simulator did not start listening on port {port}")
+
+
+def run_child(work_directory, server_file):
+    """Run one scenario in a separate interpreter so import time and peak memory are its own."""
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-scenario", work_directory, "--server-file", server_file],
+                           cwd=work_directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    with open(os.path.join(work_directory, "run.log"), "wb") as file:
+        file.write(child.stdout)
+    if child.returncode != 0:
+        raise RuntimeError(f"Scenario failed (exit {child.returncode}), see {os.path.join(work_directory, 'run.log')}")
+    with open(os.path.join(work_directory, "metrics.json"), "r") as file:
+        result = json.load(file)
+    result["process_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def summarize(scenario, result):
+    counters = result["metrics"]["counters"]
+    stages = result["metrics"]["stages"]
+    wall = result["run_seconds"]
+    return {
+        **scenario,
+        "wall_seconds": wall,
+        "import_seconds": result["import_seconds"],
+        "sensors": counters.get("sensors", 0),
+        "sensors_per_second": round(counters.get("sensors", 0) / wall, 2) if wall else None,
+        "historic_rows": counters.get("historic_rows", 0),
+        "rows_per_second": round(counters.get("historic_rows", 0) / wall, 1) if wall else None,
+        "output_rows": counters.get("output_rows", 0),
+        "http_calls": sum(stage["http_calls"] for stage in stages.values()),
+        "peak_rss_mb": result["peak_rss_mb"],
+        "peak_rss_children_mb": result["peak_rss_children_mb"],
+        "stages": stages,
+        "endpoints": result["metrics"]["endpoints"]
+    }
+
+
+def run_scenario():
+    """Child side: run run_server once in the current directory and write metrics.json."""
+    started = time.perf_counter()
+    sys.path.insert(0, repo_directory)
+    import BreachCombineComplete
+    from prtg_metrics import RunMetrics, peak_rss_mb
+    import_seconds = time.perf_counter() - started
+
+    metrics = RunMetrics()
+    started = time.perf_counter()
+    BreachCombineComplete.run_server(BreachCombineComplete.load_server_parameters(options.server_file), open_browser=False, metrics=metrics)
+    run_seconds = time.perf_counter() - started
+
+    with open("metrics.json", "w") as file:
+        json.dump({"import_seconds": round(import_seconds, 3), "run_seconds": round(run_seconds, 3), "metrics": metrics.to_dict(),
+                   "peak_rss_mb": peak_rss_mb(), "peak_rss_children_mb": peak_rss_mb("children")}, file)
+
+
+def main():
+    results = []
+    scratch = tempfile.mkdtemp(prefix="prtg-bench-")
+    flag_overrides = {"cache": "no", "info_cache": "no", "archive_sensortree": "no", "screening": "no", "summary": "no", "report_mode": "full"}
+
+    if options.cassette:
+        scenarios = [{"source": "cassette", "cassette": options.cassette}]
+    else:
+        scenarios = [{"source": "simulator", "sensors": sensors, "window": window}
+                     for sensors in options.sensors for window in options.windows]
+
+    for scenario in scenarios:
+        work_directory = os.path.join(scratch, f"scenario-{len(results) + 1}")
+        os.makedirs(work_directory)
+        simulator = None
+        try:
+            if options.cassette:
+                # run_server looks for cassettes/<profile>.zip, the profile being the server_address-<profile>.txt suffix
+                server_file = "server_address-replay.txt"
+                shutil.copy(options.server_file, os.path.join(work_directory, server_file))
+                os.makedirs(os.path.join(work_directory, "cassettes"))
+                shutil.copy(options.cassette, os.path.join(work_directory, "cassettes", "replay.zip"))
+                # Replay needs the window and flags the cassette was recorded with
+                shutil.copy(options.flags or os.path.join(repo_directory, "min_max_flags.txt"), os.path.join(work_directory, "min_max_flags.txt"))
+                with open(os.path.join(work_directory, "min_max_flags.txt"), "a") as file:
+                    file.write(f"\ncassette_mode=replay\ncassette_dir=cassettes\nreplay_timing={options.replay_timing}\n")
+            else:
+                port = free_port()
+                simulator = subprocess.Popen([sys.executable, os.path.join(repo_directory, "prtg_simulator.py"), "--port", str(port),
+                                              "--sensors", str(scenario["sensors"])] + options.simulator_args.split(),
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                wait_for_port(port)
+                server_file = "server_address-bench.txt"
+                with open(os.path.join(work_directory, server_file), "w") as file:
+                    file.write(f"server=127.0.0.1:{port}\nscheme=http\nusername=bench\npasshash=0\nmax_in_flight={options.max_in_flight}\n")
+                write_flags(os.path.join(work_directory, "min_max_flags.txt"), {
+                    **flag_overrides, "avg": 0,
+                    "sdate": (window_end - parse_window(scenario["window"])).strftime("%Y-%m-%d-%H-%M-%S"),
+                    "edate": window_end.strftime("%Y-%m-%d-%H-%M-%S")
+                })
+
+            print(f"Running {scenario} ...", flush=True)
+            summary = summarize(scenario, run_child(work_directory, server_file))
+            results.append(summary)
+            print(f"  {summary['wall_seconds']:.1f}s, {summary['sensors_per_second']} sensors/s, {summary['rows_per_second']} rows/s, "
+                  f"{summary['http_calls']} HTTP calls, peak RSS {summary['peak_rss_mb']} MB", flush=True)
+            for name, stage in summary["stages"].items():
+                print(f"    {name:<11} {stage['wall_seconds']:>9.2f}s wall {stage['cpu_seconds']:>9.2f}s CPU {stage['http_calls']:>8} calls", flush=True)
+        except Exception as e:
+            print(f"  Error: {e}")
+            results.append({**scenario, "error": str(e)})
+        finally:
+            if simulator is not None:
+                simulator.terminate()
+                simulator.wait()
+
+    report = {
+        "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scenarios": results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(options.output)), exist_ok=True)
+    with open(options.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Benchmark results have been saved to {options.output}")
+
+    if options.keep:
+        print(f"Scenario directories kept in {scratch}")
+    else:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BreachCombineComplete.py end to end.")
+    parser.add_argument("--sensors", type=lambda text: [int(value) for value in text.split(",")], default=[100, 1000, 10000, 50000],
+                        help="comma-separated simulated sensor counts")
+    parser.add_argument("--windows", type=lambda text: text.split(","), default=["1h", "1d", "7d"],
+                        help="comma-separated raw (avg=0) window lengths such as 1h, 1d, 7d")
+    parser.add_argument("--simulator-args", default="", help="extra prtg_simulator.py arguments, e.g. \"--latency historicdata=0.05\"")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--cassette", help="replay this cassette instead of running the simulator")
+    parser.add_argument("--server-file", help="server file the cassette was recorded with")
+    parser.add_argument("--flags", help="min_max_flags.txt the cassette was recorded with (default: the repo's)")
+    parser.add_argument("--replay-timing", choices=["fast", "original"], default="fast")
+    parser.add_argument("--output", default=os.path.join("benchmarks", f"bench-{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"))
+    parser.add_argument("--keep", action="store_true", help="keep the scenario directories (CSV, HTML, logs)")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.cassette and not options.server_file:
+        parser.error("--cassette needs --server-file")
+
+    if options.run_scenario:
+        run_scenario()
+    else:
+        for window in options.windows:
+            parse_window(window)
+        main()
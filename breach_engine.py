@@ -0,0 +1,166 @@
+import csv
+import io
+import signal
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from prtg_sketch import QuantileSketch
+
+
+# Kept free of module-level side effects so ProcessPoolExecutor workers can
+# import it on every platform (BreachCombineComplete.py prompts on import).
+
+def ignore_interrupts():
+    """Process pool initializer: leave Ctrl-C to the parent, which shuts the pool down itself."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def parse_traffic_total(df):
+    """Return the Traffic Total (Speed) column of a historicdata.csv frame as floats (Mbit/s)."""
+    return df['Traffic Total (Speed)'].astype(str).str.replace(',', '').str.extract(r'(\d+\.*\d*)', expand=False).astype(float)
+
+def coalesce_breaches(df, traffic, breach_mask):
+    """Merge runs of consecutive over-limit samples into breach intervals.
+
+    Returns a dict of equal-length arrays, one entry per interval: the Date
+    Time of its first and last sample, its duration in seconds, its peak and
+    mean traffic and its sample count. The duration runs from the first
+    sample's start to the last sample's start plus the sensor's usual sample
+    spacing (taken from Date Time(RAW), NaN when that column is missing).
+    """
+    rows = np.flatnonzero(breach_mask)
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(rows)]))
+    first_rows = rows[starts]
+    last_rows = rows[ends - 1]
+
+    breach_traffic = traffic[rows]
+    counts = ends - starts
+
+    if 'Date Time(RAW)' in df.columns:
+        # Date Time(RAW) is in days
+        raw_times = pd.to_numeric(df['Date Time(RAW)'], errors='coerce').to_numpy() * 86400
+        spacing = np.nanmedian(np.diff(raw_times)) if len(raw_times) > 1 else 0.0
+        durations = np.round(raw_times[last_rows] - raw_times[first_rows] + spacing)
+    else:
+        durations = np.full(len(starts), np.nan)
+
+    dates = df['Date Time'].to_numpy()
+    return {
+        "dates": dates[first_rows],
+        "end_dates": dates[last_rows],
+        "durations": durations,
+        "traffic": np.maximum.reduceat(breach_traffic, starts),
+        "means": np.add.reduceat(breach_traffic, starts) / counts,
+        "counts": counts
+    }
+
+def evaluate_historic_csv(raw_csv, upper_warning_limit, encoding=None, intervals=False, sketch_accuracy=None):
+    """Parse one sensor's raw historicdata.csv and compare it with its upper warning limit.
+
+    Returns None when the Traffic Total (Speed) column is missing. Otherwise a
+    small dict is returned instead of the whole frame: the Date Time and
+    traffic values of the samples above the limit, or, when nothing crossed
+    it, the peak traffic and its date; "samples" counts the rows read. With
+    intervals=True consecutive samples above the limit are merged first (see
+    coalesce_breaches) and traffic holds each interval's peak. With
+    sketch_accuracy set, the dict also carries a QuantileSketch of every
+    sample under "sketch". "parse_seconds" is the CPU time the evaluation took.
+    """
+    started = time.process_time()
+    df = pd.read_csv(io.BytesIO(raw_csv), encoding=encoding or 'utf-8', encoding_errors='replace')
+
+    if 'Traffic Total (Speed)' not in df.columns:
+        return None
+
+    selected_data = parse_traffic_total(df)
+    breach_mask = (selected_data > upper_warning_limit).to_numpy()
+
+    if breach_mask.any():
+        if intervals:
+            summary = coalesce_breaches(df, selected_data.to_numpy(), breach_mask)
+        else:
+            summary = {
+                "dates": df['Date Time'].to_numpy()[breach_mask],
+                "traffic": selected_data.to_numpy()[breach_mask]
+            }
+    else:
+        max_traffic = selected_data.max()
+        max_traffic_date = df.loc[selected_data.idxmax(), 'Date Time'] if not pd.isnull(max_traffic) else "N/A"
+        summary = {
+            "dates": None,
+            "traffic": None,
+            "max_traffic": max_traffic,
+            "max_traffic_date": max_traffic_date
+        }
+
+    summary["samples"] = len(df)
+    if sketch_accuracy is not None:
+        summary["sketch"] = QuantileSketch(sketch_accuracy).add(selected_data.to_numpy())
+    summary["parse_seconds"] = time.process_time() - started
+    return summary
+
+def split_historic_csv(raw_csv, encoding=None):
+    """Return (header, rows) of a historicdata.csv body, leaving out PRTG's trailing sums row."""
+    reader = csv.reader(io.StringIO(raw_csv.decode(encoding or 'utf-8', errors='replace')))
+    header = next(reader, None)
+    if header is None:
+        return None, []
+    # The sums row is the only one without a Date Time(RAW) value
+    raw_index = header.index('Date Time(RAW)') if 'Date Time(RAW)' in header else None
+    rows = [row for row in reader if row and (raw_index is None or (len(row) > raw_index and row[raw_index]))]
+    return header, rows
+
+def join_historic_csv(header, pieces):
+    """Join the rows of consecutive windows back into one historicdata.csv body (UTF-8).
+
+    A sample on the boundary between two windows can be returned by both, so a
+    row repeating the previous row's Date Time is dropped.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    last_date = None
+    for rows in pieces:
+        for row in rows:
+            if row[0] == last_date:
+                continue
+            writer.writerow(row)
+            last_date = row[0]
+    return output.getvalue().encode('utf-8')
+
+# Segment boundaries are counted from here, so every window lines up on the same segments
+segment_origin = datetime(2000, 1, 1)
+
+def plan_historic_pieces(sdate, edate, segment_seconds, now, settle_seconds=0):
+    """Split [sdate, edate) into (start, end, cacheable) pieces on segment boundaries.
+
+    Boundaries are multiples of segment_seconds from a fixed origin, so every
+    window lines up on the same segments. A piece is cacheable when it is a
+    whole segment that ended at least settle_seconds before now, so PRTG has
+    stored its last scans; partial segments at either end of the window are
+    merged with their non-cacheable neighbours.
+    """
+    origin = segment_origin
+    pieces = []
+    start = sdate
+    while start < edate:
+        boundary = origin + timedelta(seconds=((start - origin).total_seconds() // segment_seconds + 1) * segment_seconds)
+        end = min(boundary, edate)
+        cacheable = end == boundary and (boundary - start).total_seconds() == segment_seconds and boundary <= now - timedelta(seconds=settle_seconds)
+        if pieces and not cacheable and not pieces[-1][2]:
+            pieces[-1] = (pieces[-1][0], end, False)
+        else:
+            pieces.append((start, end, cacheable))
+        start = end
+    return pieces
+
+def split_window(start, end, chunk_seconds):
+    """Split [start, end) into consecutive (start, end) chunks of at most chunk_seconds."""
+    chunks = []
+    while start < end:
+        chunk_end = min(start + timedelta(seconds=chunk_seconds), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end
+    return chunks
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Compressed on-disk cache of PRTG response bodies with size-based LRU eviction.
+
+    Entries are gzip files under directory, named after a hash of their key.
+    File modification times double as the LRU order, so the order survives
+    between runs: a hit touches the file, and once the cache grows past
+    max_bytes the least recently used files are deleted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # path -> size, oldest first
+        self.entries = OrderedDict()
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".gz") and os.path.isfile(path):
+                stat = os.stat(path)
+                existing.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(existing):
+            self.entries[path] = size
+        self.total_bytes = sum(self.entries.values())
+
+    def path_for(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.gz")
+
+    def get(self, key, max_age=None):
+        """Return (body, encoding) for key, or None on a miss or an entry older than max_age seconds."""
+        path = self.path_for(key)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                raise FileNotFoundError(path)
+            with gzip.open(path, "rb") as file:
+                encoding, _, body = file.read().partition(b"\n")
+        except (OSError, EOFError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+            if path in self.entries:
+                self.entries.move_to_end(path)
+        # Touching the file keeps the on-disk LRU order in step, but it would
+        # also reset the age, so entries under a max_age keep their write time
+        if max_age is None:
+            try:
+                os.utime(path)
+            except OSError:
+                # Evicted by a concurrent put() since it was read; the body is still good
+                pass
+        return body, encoding.decode("ascii") or None
+
+    def put(self, key, body, encoding=None):
+        path = self.path_for(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wb", compresslevel=6) as file:
+            file.write((encoding or "").encode("ascii") + b"\n" + body)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(path, 0)
+            self.entries[path] = size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                oldest_path, oldest_size = self.entries.popitem(last=False)
+                self.total_bytes -= oldest_size
+                self.evictions += 1
+                try:
+                    os.remove(oldest_path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions, {self.total_bytes / 1000000:.1f} MB on disk"
+
+
+class SensorInfoCache:
+    """Persistent cache of per-sensor facts (upper warning limits, sensor details) for one server.
+
+    Each field of an entry expires ttl seconds after it was stored. Entries also
+    remember a fingerprint of the sensor's sensortree record, and
+    invalidate_changed() drops the cached fields of every sensor whose record
+    differs from the one seen when they were stored.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                self.sensors = json.load(file)
+        except (OSError, ValueError):
+            self.sensors = {}
+
+    def invalidate_changed(self, fingerprints):
+        """Record the current {sensor ID: fingerprint} and return how many sensors were invalidated."""
+        invalidated = 0
+        with self.lock:
+            for sensor_id, fingerprint in fingerprints.items():
+                entry = self.sensors.get(sensor_id)
+                if entry is None:
+                    self.sensors[sensor_id] = {"fingerprint": fingerprint}
+                elif entry.get("fingerprint") != fingerprint:
+                    self.sensors[sensor_id] = {"fingerprint": fingerprint}
+                    invalidated += 1
+        return invalidated
+
+    def get(self, sensor_id, field):
+        """Return (True, value) for a fresh cached field, (False, None) otherwise."""
+        with self.lock:
+            stored = self.sensors.get(sensor_id, {}).get(field)
+            if stored is not None and time.time() - stored["time"] <= self.ttl:
+                self.hits += 1
+                return True, stored["value"]
+            self.misses += 1
+            return False, None
+
+    def put(self, sensor_id, field, value):
+        with self.lock:
+            self.sensors.setdefault(sensor_id, {})[field] = {"value": value, "time": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.sensors, file)
+        os.replace(temp_path, self.path)
+
+def fingerprint(record):
+    """Return a short stable hash of a dict, used to spot changed sensortree records."""
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+import zipfile
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+# Query parameters that never go into a cassette
+credential_parameters = {"username", "password", "passhash"}
+
+
+def request_key(method, url):
+    """Return the cassette key of a request: method, path and sorted query without credentials."""
+    parts = urllib.parse.urlsplit(url)
+    query = sorted((name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in credential_parameters)
+    return f"{method} {parts.path}?{urllib.parse.urlencode(query)}"
+
+
+class Cassette:
+    """PRTG responses recorded under their request keys, saved as a zip archive.
+
+    The archive holds index.json (per key, the recorded responses in the order
+    they were made: status, content type and the seconds the full response
+    took) and one deflated file per distinct body, so repeated bodies are only
+    stored once. Bodies are kept decoded (no gzip transfer encoding). A key
+    requested several times replays its recordings in order and then keeps
+    returning the last one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.bodies = {}
+        self.replay_positions = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        with zipfile.ZipFile(self.path) as archive:
+            self.entries = json.loads(archive.read("index.json"))
+            self.bodies = {name[len("bodies/"):]: archive.read(name) for name in archive.namelist() if name.startswith("bodies/")}
+        return self
+
+    def record(self, key, status, content_type, body, seconds):
+        digest = hashlib.sha1(body).hexdigest()
+        with self.lock:
+            self.bodies[digest] = body
+            self.entries.setdefault(key, []).append({"status": status, "content_type": content_type, "body": digest, "seconds": round(seconds, 4)})
+
+    def next_response(self, key):
+        """Return (status, content type, body, seconds) for the next replay of key, or None if it was never recorded."""
+        with self.lock:
+            recordings = self.entries.get(key)
+            if not recordings:
+                return None
+            position = self.replay_positions.get(key, 0)
+            self.replay_positions[key] = position + 1
+            entry = recordings[min(position, len(recordings) - 1)]
+        return entry["status"], entry["content_type"], self.bodies[entry["body"]], entry["seconds"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with self.lock:
+            with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+                archive.writestr("index.json", json.dumps(self.entries))
+                for digest, body in self.bodies.items():
+                    archive.writestr(f"bodies/{digest}", body)
+        os.replace(temp_path, self.path)
+
+    def stats(self):
+        return f"{sum(len(recordings) for recordings in self.entries.values())} responses, {len(self.bodies)} distinct bodies"
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that also records every response it receives into a Cassette."""
+
+    def __init__(self, cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Reading the body here means a streamed response is recorded whole;
+        # the caller then iterates over the body already read
+        body = response.content
+        self.cassette.record(request_key(request.method, request.url), response.status_code,
+                             response.headers.get("Content-Type"), body, time.perf_counter() - started)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that answers every request from a Cassette instead of the network.
+
+    With original_timing each response takes as long as it did when it was
+    recorded; otherwise responses come back at once. Requests that were never
+    recorded get a 404.
+    """
+
+    def __init__(self, cassette, original_timing=False):
+        super().__init__()
+        self.cassette = cassette
+        self.original_timing = original_timing
+        self.num_requests = 0
+        self.num_missing = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        recorded = self.cassette.next_response(request_key(request.method, request.url))
+        with self.lock:
+            self.num_requests += 1
+            self.num_missing += recorded is None
+        if recorded is None:
+            status, content_type, body, seconds = 404, "text/plain", b"Not in cassette", 0
+        else:
+            status, content_type, body, seconds = recorded
+        if self.original_timing:
+            time.sleep(seconds)
+
+        response = Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type} if content_type else {})
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+import urllib.parse
+from prtg_sketch import QuantileSketch
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is then left out
+    resource = None
+
+
+def peak_rss_mb(who="self"):
+    """Peak resident memory in MB of this process ("self") or its finished and waited-for children ("children")."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+latency_buckets = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+def endpoint_name(url):
+    """Name a PRTG API call by its path, plus the content for table.xml (table.xml?content=sensortree)."""
+    parts = urllib.parse.urlsplit(url)
+    name = parts.path.rsplit("/", 1)[-1]
+    content = urllib.parse.parse_qs(parts.query).get("content")
+    return f"{name}?content={content[0]}" if content else name
+
+
+class RunMetrics:
+    """Wall and CPU time, HTTP calls and peak memory per stage of one run, plus named counters.
+
+    The pipeline marks where each stage starts with start(); a stage ends when
+    the next one starts or at finish(). request_counter, if set, is a callable
+    returning the number of HTTP requests made so far. CPU time is this
+    process's (all threads); work done in parse worker processes is counted
+    separately by the caller.
+
+    record_response is a requests response hook that keeps a latency sketch,
+    histogram, byte and status counts per API endpoint, and record_sensor
+    collects per-sensor historic timings so the slowest sensors can be listed.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.endpoints = {}
+        self.sensors = {}
+        self.request_counter = None
+        self.current = None
+        self.lock = threading.Lock()
+
+    def requests_so_far(self):
+        return self.request_counter() if self.request_counter is not None else 0
+
+    def start(self, name):
+        self.finish()
+        self.current = (name, time.perf_counter(), time.process_time(), self.requests_so_far())
+
+    def finish(self):
+        if self.current is None:
+            return
+        name, started, cpu_started, requests_before = self.current
+        self.current = None
+        stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "http_calls": 0})
+        stage["wall_seconds"] = round(stage["wall_seconds"] + time.perf_counter() - started, 4)
+        stage["cpu_seconds"] = round(stage["cpu_seconds"] + time.process_time() - cpu_started, 4)
+        stage["http_calls"] += self.requests_so_far() - requests_before
+        stage["peak_rss_mb"] = peak_rss_mb()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_response(self, response, *args, **kwargs):
+        """requests response hook: time the call and count its bytes.
+
+        The body is read here for ordinary calls (the session would read it
+        next anyway), so the time covers the whole response. Streamed calls
+        are timed to their headers and sized by Content-Length, if sent.
+        """
+        seconds = response.elapsed.total_seconds()
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length", 0))
+        else:
+            started = time.perf_counter()
+            size = len(response.content)
+            seconds += time.perf_counter() - started
+
+        name = endpoint_name(response.request.url)
+        bucket = next((index for index, bound in enumerate(latency_buckets) if seconds <= bound), len(latency_buckets))
+        status = str(response.status_code)
+        with self.lock:
+            endpoint = self.endpoints.get(name)
+            if endpoint is None:
+                endpoint = {"sketch": QuantileSketch(0.01), "histogram": [0] * (len(latency_buckets) + 1), "bytes": 0, "statuses": {}}
+                self.endpoints[name] = endpoint
+            endpoint["sketch"].add([seconds])
+            endpoint["histogram"][bucket] += 1
+            endpoint["bytes"] += size
+            endpoint["statuses"][status] = endpoint["statuses"].get(status, 0) + 1
+        return response
+
+    def record_sensor(self, sensor_id, **values):
+        """Add values (e.g. download_seconds=1.2, calls=3) to the sensor's totals."""
+        with self.lock:
+            totals = self.sensors.setdefault(sensor_id, {})
+            for name, value in values.items():
+                totals[name] = totals.get(name, 0) + value
+
+    def endpoint_report(self):
+        report = {}
+        for name, endpoint in sorted(self.endpoints.items()):
+            sketch = endpoint["sketch"]
+            report[name] = {
+                "calls": sketch.count,
+                "bytes": endpoint["bytes"],
+                "statuses": endpoint["statuses"],
+                "mean_seconds": round(sketch.mean(), 4),
+                "p50_seconds": round(sketch.quantile(0.5), 4),
+                "p95_seconds": round(sketch.quantile(0.95), 4),
+                "p99_seconds": round(sketch.quantile(0.99), 4),
+                "max_seconds": round(sketch.max, 4),
+                "histogram": {f"<={bound}s": count for bound, count in zip(latency_buckets, endpoint["histogram"])} |
+                             {f">{latency_buckets[-1]}s": endpoint["histogram"][-1]}
+            }
+        return report
+
+    def slowest_sensors(self, count=20):
+        """The sensors with the most historic download plus parse time, slowest first."""
+        ranked = sorted(self.sensors.items(), key=lambda item: -(item[1].get("download_seconds", 0) + item[1].get("parse_seconds", 0)))
+        return [{"sensor_id": sensor_id, **{name: round(value, 4) if isinstance(value, float) else value for name, value in totals.items()}}
+                for sensor_id, totals in ranked[:count]]
+
+    def to_dict(self):
+        counters = {name: round(value, 4) if isinstance(value, float) else value for name, value in self.counters.items()}
+        return {"stages": self.stages, "counters": counters, "endpoints": self.endpoint_report(), "slowest_sensors": self.slowest_sensors()}
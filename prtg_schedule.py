@@ -0,0 +1,89 @@
+import re
+from datetime import timedelta
+
+
+class IntervalSchedule:
+    """Runs every fixed number of seconds."""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError(f"Schedule interval must be positive, got {seconds}")
+        self.seconds = seconds
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+
+class CronSchedule:
+    """Runs on the minutes matched by a five-field cron expression.
+
+    Fields are minute, hour, day of month, month and day of week (0 or 7 is
+    Sunday), each a '*', a number, a range a-b, a list a,b,c or any of those
+    with a /step. As in cron, when both day fields are restricted a day matching
+    either of them is enough.
+    """
+
+    field_ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self.parse_field(field, low, high) for field, (low, high) in zip(fields, self.field_ranges))
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            match = re.fullmatch(r'(\*|\d+(?:-\d+)?)(?:/(\d+))?', part)
+            if match is None:
+                raise ValueError(f"Invalid cron field {field!r}")
+            span, step = match.group(1), int(match.group(2) or 1)
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(value) for value in span.split("-"))
+            else:
+                start = int(span)
+                end = high if match.group(2) else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def day_matches(self, moment):
+        day_match = moment.day in self.days
+        # Python counts Monday as 0, cron counts Sunday as 0
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Whole days and hours that can't match are skipped, so this stays
+        # quick even for sparse expressions
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months or not self.day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError("Cron expression never matches")
+
+
+def parse_schedule(text):
+    """Return a schedule for an interval like 900, 90s, 15m or 2h, or a cron expression."""
+    text = text.strip()
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([smh]?)', text)
+    if match is not None:
+        return IntervalSchedule(float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)])
+    return CronSchedule(text)
@@ -0,0 +1,333 @@
+# Local stand-in for a PRTG server, for scale and latency testing of
+# BreachCombineComplete.py without touching production.
+#
+#   python prtg_simulator.py --sensors 20000 --port 8080 --latency historicdata=0.2 --error-rate getobjectproperty=0.01
+#
+# and point a server file at it:
+#
+#   server=127.0.0.1:8080
+#   scheme=http
+#   username=simulator
+#   passhash=0
+#
+# Pass --certfile/--keyfile to serve HTTPS instead (the script then needs
+# REQUESTS_CA_BUNDLE pointing at the certificate). Every answer is generated
+# from --seed, so two runs against the same settings see the same data.
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import random
+import signal
+import ssl
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+endpoints = ("sensortree", "channels", "getobjectproperty", "getsensordetails", "historicdata")
+
+# OLE automation dates, which is what PRTG's Date Time(RAW) column holds
+ole_epoch = datetime(1899, 12, 30)
+
+
+class SimulatedPRTG:
+    """Synthetic sensortree plus deterministic limits, details and traffic history.
+
+    Each device holds sensors_per_device SNMP Traffic sensors and one SNMP
+    Custom temperature sensor whose last value carries the latin-1 "(°C)"
+    byte that real PRTG servers send in an otherwise UTF-8 document.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.sensors = {}
+        rng = random.Random(options.seed)
+
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<prtg><sensortree><nodes>'
+                 '<group id="0" noaccess="0"><name>Root</name><id>0</id>']
+        next_id = 1000
+        traffic_sensors = 0
+        device_number = 0
+        for probe_number in range(options.probes):
+            next_id += 1
+            parts.append(f'<probenode id="{next_id}"><name>Probe {probe_number + 1}</name><id>{next_id}</id>')
+            group_number = 0
+            while traffic_sensors < options.sensors * (probe_number + 1) // options.probes:
+                next_id += 1
+                group_number += 1
+                # A non-ASCII group name exercises the UTF-8 side of the decoding
+                parts.append(f'<group id="{next_id}"><name>Zone {group_number} – Café</name><id>{next_id}</id>')
+                for _ in range(options.devices_per_group):
+                    if traffic_sensors >= options.sensors * (probe_number + 1) // options.probes:
+                        break
+                    next_id += 1
+                    device_id = next_id
+                    device_number += 1
+                    device_name = f"Switch {device_number}"
+                    parts.append(f'<device id="{device_id}"><name>{device_name}</name><id>{device_id}</id>')
+                    for port in range(options.sensors_per_device):
+                        if traffic_sensors >= options.sensors * (probe_number + 1) // options.probes:
+                            break
+                        next_id += 1
+                        traffic_sensors += 1
+                        sensor_name = f"Port {port + 1}"
+                        limit_mbit = rng.choice((100, 200, 500, 1000))
+                        self.sensors[str(next_id)] = {
+                            "device_name": device_name,
+                            "device_id": device_id,
+                            "name": sensor_name,
+                            "sensortype": "SNMP Traffic",
+                            "limit_mbit": None if rng.random() < options.missing_limit_rate else limit_mbit,
+                            # Breaching sensors swing up to 1.2x their limit, the others stay under half of it
+                            "base": limit_mbit * (0.6 if rng.random() < options.breach_rate else 0.3),
+                            "phase": rng.random() * 2 * math.pi
+                        }
+                        parts.append(f'<sensor id="{next_id}"><name>{sensor_name}</name><id>{next_id}</id>'
+                                     f'<sensortype>SNMP Traffic</sensortype><lastvalue>{limit_mbit // 3} Mbit/s</lastvalue></sensor>')
+                    next_id += 1
+                    parts.append(f'<sensor id="{next_id}"><name>Temperature</name><id>{next_id}</id>'
+                                 f'<sensortype>SNMP Custom</sensortype><lastvalue>{rng.randint(30, 60)} (\x00C)</lastvalue></sensor>')
+                    parts.append('</device>')
+                parts.append('</group>')
+            parts.append('</probenode>')
+        parts.append('</group></nodes></sensortree></prtg>\n')
+        # The NUL placeholder becomes a lone latin-1 degree sign
+        self.sensortree = ''.join(parts).encode('utf-8').replace(b'\x00', b'\xb0')
+        self.sensor_ids = sorted(self.sensors, key=int)
+
+    def noise(self, *key):
+        """Deterministic value in [-1, 1) for key."""
+        digest = hashlib.blake2b(repr((self.options.seed,) + key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 63 - 1
+
+    def traffic(self, sensor, sensor_id, moment, avg):
+        """Traffic in Mbit/s for the sample starting at moment: a daily swing plus noise that averages out over longer samples."""
+        limit = sensor["limit_mbit"] or 1000
+        seconds = (moment - ole_epoch).total_seconds() + avg / 2
+        swing = math.sin(2 * math.pi * seconds / 86400 + sensor["phase"])
+        noise = self.noise(sensor_id, int(seconds), avg) * 0.1 * limit / math.sqrt(max(avg / self.options.scan_interval, 1))
+        return max(sensor["base"] * (1 + swing) + noise, 0.0)
+
+    def historic_csv(self, sensor_id, avg, sdate, edate):
+        sensor = self.sensors.get(sensor_id)
+        header = ["Date Time", "Date Time(RAW)", "Traffic Total (Volume)", "Traffic Total (Volume)(RAW)",
+                  "Traffic Total (Speed)", "Traffic Total (Speed)(RAW)"]
+        for channel in range(self.options.extra_channels):
+            header += [f"Channel {channel + 1} (Speed)", f"Channel {channel + 1} (Speed)(RAW)"]
+        header += ["Coverage", "Coverage(RAW)"]
+        rows = [','.join(f'"{name}"' for name in header)]
+
+        step = avg or self.options.scan_interval
+        moment = sdate
+        total_bytes = 0.0
+        while sensor is not None and moment < edate:
+            sample_end = moment + timedelta(seconds=step)
+            speed = self.traffic(sensor, sensor_id, moment, step)
+            volume = speed * 125000 * step
+            total_bytes += volume
+            date_text = f"{moment.month}/{moment.day}/{moment.year} {moment.strftime('%I:%M:%S %p').lstrip('0')} - {sample_end.strftime('%I:%M:%S %p').lstrip('0')}"
+            values = [date_text, f"{(moment - ole_epoch).total_seconds() / 86400:.10f}",
+                      f"{volume / 1000000:,.0f} MByte", f"{volume:.4f}",
+                      f"{speed:,.2f} Mbit/s", f"{speed * 125000:.4f}"]
+            for channel in range(self.options.extra_channels):
+                channel_speed = speed * (channel + 1) / (self.options.extra_channels + 1)
+                values += [f"{channel_speed:,.2f} Mbit/s", f"{channel_speed * 125000:.4f}"]
+            values += ["100 %", "10000"]
+            rows.append(','.join(f'"{value}"' for value in values))
+            moment = sample_end
+
+        # PRTG closes the table with a sums row that has no Date Time(RAW)
+        sums = ["Sums (of which 100% coverage)", "", f"{total_bytes / 1000000:,.0f} MByte", f"{total_bytes:.4f}"] + [""] * (len(header) - 4)
+        rows.append(','.join(f'"{value}"' for value in sums))
+        return ('\n'.join(rows) + '\n').encode('utf-8')
+
+    def channel_table(self, start, count):
+        """One page of the channel table: two channel items per sensor, paged by item like PRTG does."""
+        items = []
+        end = min(start + count, 2 * len(self.sensor_ids))
+        for index in range(start, end):
+            sensor_id = self.sensor_ids[index // 2]
+            if index % 2 == 0:
+                limit_mbit = self.sensors[sensor_id]["limit_mbit"]
+                limit_text = f"{limit_mbit * 125000:,}" if limit_mbit is not None else ""
+                items.append(f'<item><objid>-1</objid><parentid>{sensor_id}</parentid><name>Traffic Total</name>'
+                             f'<limitmaxwarning>{limit_text}</limitmaxwarning></item>')
+            else:
+                items.append(f'<item><objid>0</objid><parentid>{sensor_id}</parentid><name>Traffic In</name>'
+                             f'<limitmaxwarning></limitmaxwarning></item>')
+        return (f'<?xml version="1.0" encoding="UTF-8"?>\n<channels totalcount="{2 * len(self.sensor_ids)}" listend="1">'
+                + ''.join(items) + '</channels>\n').encode('utf-8')
+
+
+def parse_endpoint_values(values, default):
+    """Turn ["historicdata=0.2", "all=0.01"] into {endpoint: float}, with all setting every endpoint."""
+    settings = dict.fromkeys(endpoints, default)
+    for value in values or []:
+        endpoint, _, number = value.partition("=")
+        if endpoint == "all":
+            settings = dict.fromkeys(endpoints, float(number))
+        elif endpoint in settings:
+            settings[endpoint] = float(number)
+        else:
+            raise SystemExit(f"Unknown endpoint {endpoint!r}, expected one of: all, {', '.join(endpoints)}")
+    return settings
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is normal, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def stop_serving(signum, frame):
+    raise KeyboardInterrupt
+
+
+def make_handler(prtg, options, latency, error_rate, stats):
+    stats_lock = threading.Lock()
+
+    class PRTGHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            if options.verbose:
+                super().log_message(format, *args)
+
+        def send_body(self, status, body, content_type):
+            if options.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=5)
+                encoding = "gzip"
+            else:
+                encoding = None
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+
+            if url.path == "/api/table.xml" and query.get("content") == "sensortree":
+                endpoint = "sensortree"
+            elif url.path == "/api/table.xml" and query.get("content") == "channels":
+                endpoint = "channels"
+            elif url.path == "/api/getobjectproperty.htm":
+                endpoint = "getobjectproperty"
+            elif url.path == "/api/getsensordetails.json":
+                endpoint = "getsensordetails"
+            elif url.path == "/api/historicdata.csv":
+                endpoint = "historicdata"
+            else:
+                self.send_body(404, b"Not found", "text/plain")
+                return
+
+            if latency[endpoint]:
+                time.sleep(latency[endpoint] * (1 + options.jitter * (2 * random.random() - 1)))
+
+            failed = random.random() < error_rate[endpoint]
+            with stats_lock:
+                stats[endpoint][0] += 1
+                stats[endpoint][1] += failed
+            if failed:
+                self.send_body(503, b'<?xml version="1.0" encoding="UTF-8"?><prtg><error>Simulated failure</error></prtg>', "text/xml")
+                return
+
+            try:
+                if endpoint == "sensortree":
+                    self.send_body(200, prtg.sensortree, "text/xml; charset=UTF-8")
+                elif endpoint == "channels":
+                    self.send_body(200, prtg.channel_table(int(query.get("start", 0)), int(query.get("count", 500))), "text/xml; charset=UTF-8")
+                elif endpoint == "getobjectproperty":
+                    sensor = prtg.sensors.get(query.get("id"))
+                    limit_mbit = sensor["limit_mbit"] if sensor is not None else None
+                    result = limit_mbit * 125000 if limit_mbit is not None else "(Property not found)"
+                    self.send_body(200, f'<?xml version="1.0" encoding="UTF-8"?><prtg><version>24.2</version><result>{result}</result></prtg>'.encode(), "text/xml; charset=UTF-8")
+                elif endpoint == "getsensordetails":
+                    sensor = prtg.sensors.get(query.get("id"))
+                    if sensor is None:
+                        self.send_body(400, b'{"error": "Object not found"}', "application/json")
+                        return
+                    details = {"prtgversion": "24.2", "sensordata": {"name": sensor["name"], "sensortype": sensor["sensortype"],
+                                                                      "parentdevicename": sensor["device_name"], "parentdeviceid": str(sensor["device_id"])}}
+                    self.send_body(200, json.dumps(details).encode(), "application/json")
+                else:
+                    sdate = datetime.strptime(query["sdate"], "%Y-%m-%d-%H-%M-%S")
+                    edate = datetime.strptime(query["edate"], "%Y-%m-%d-%H-%M-%S")
+                    self.send_body(200, prtg.historic_csv(query.get("id"), int(query.get("avg", 0)), sdate, edate), "text/csv; charset=UTF-8")
+            except (KeyError, ValueError) as e:
+                self.send_body(400, f"Bad request: {e}".encode(), "text/plain")
+
+    return PRTGHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated PRTG API server for load and latency testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate")
+    parser.add_argument("--keyfile", help="private key for --certfile")
+    parser.add_argument("--sensors", type=int, default=1000, help="number of SNMP Traffic sensors")
+    parser.add_argument("--probes", type=int, default=2)
+    parser.add_argument("--devices-per-group", type=int, default=20)
+    parser.add_argument("--sensors-per-device", type=int, default=8)
+    parser.add_argument("--breach-rate", type=float, default=0.3, help="share of sensors whose traffic crosses their limit")
+    parser.add_argument("--missing-limit-rate", type=float, default=0.05, help="share of sensors without an upper warning limit")
+    parser.add_argument("--scan-interval", type=int, default=60, help="sample spacing in seconds for avg=0")
+    parser.add_argument("--extra-channels", type=int, default=0, help="extra speed columns per historicdata.csv row, to grow responses")
+    parser.add_argument("--latency", action="append", metavar="ENDPOINT=SECONDS",
+                        help=f"added latency per endpoint ({', '.join(endpoints)} or all); repeatable")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by up to this fraction either way")
+    parser.add_argument("--error-rate", action="append", metavar="ENDPOINT=P",
+                        help="probability of answering 503 per endpoint; repeatable")
+    parser.add_argument("--gzip", action="store_true", help="gzip responses for clients that accept it")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    options = parser.parse_args()
+    if options.probes < 1 or options.devices_per_group < 1 or options.sensors_per_device < 1:
+        parser.error("--probes, --devices-per-group and --sensors-per-device must be at least 1")
+
+    latency = parse_endpoint_values(options.latency, 0.0)
+    error_rate = parse_endpoint_values(options.error_rate, 0.0)
+
+    started = time.time()
+    prtg = SimulatedPRTG(options)
+    print(f"Generated {len(prtg.sensors)} SNMP Traffic sensors ({len(prtg.sensortree) / 1000000:.1f} MB sensortree) in {time.time() - started:.1f}s")
+
+    # endpoint -> [requests, simulated failures]
+    stats = {endpoint: [0, 0] for endpoint in endpoints}
+    server = SimulatorServer((options.host, options.port), make_handler(prtg, options, latency, error_rate, stats))
+    # Stopped with kill as well as Ctrl-C, the request counts are still printed
+    signal.signal(signal.SIGTERM, stop_serving)
+    scheme = "http"
+    if options.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(options.certfile, options.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    print(f"Serving simulated PRTG on {scheme}://{options.host}:{options.port} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for endpoint, (requests, failures) in stats.items():
+            print(f"{endpoint}: {requests} requests, {failures} simulated failures")
+
+
+if __name__ == "__main__":
+    main()
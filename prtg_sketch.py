@@ -0,0 +1,97 @@
+import math
+import numpy as np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a bounded relative error (log-spaced buckets, as in DDSketch).
+
+    Positive values are counted in buckets whose bounds grow by a factor of
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy), so any quantile
+    is returned within relative_accuracy of the true sample value while only
+    bucket counts are kept. Values at or below zero share one bucket and NaNs
+    are ignored. Count, sum, min and max are exact. Sketches with the same
+    relative_accuracy merge by adding counts, so per-segment or per-server
+    sketches can be combined without the samples behind them.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # bucket index -> count; bucket i holds values in (gamma**(i-1), gamma**i]
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        """Add an array-like of samples."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def merge(self, other):
+        """Add other's counts into this sketch."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative_accuracy can be merged")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Return the q-quantile (0 <= q <= 1) of the samples added, or NaN when there are none."""
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return min(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Bucket midpoint (in relative terms), kept inside the exact range
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def to_dict(self):
+        """Return the sketch as JSON-serializable data (see from_dict)."""
+        return {"relative_accuracy": self.relative_accuracy, "buckets": self.buckets, "zero_count": self.zero_count,
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        # JSON turns the bucket indexes into strings
+        sketch.buckets = {int(index): count for index, count in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
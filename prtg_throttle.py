@@ -0,0 +1,230 @@
+import random
+import threading
+import time
+from urllib3.exceptions import ReadTimeoutError
+from requests.adapters import BaseAdapter
+from requests.exceptions import ChunkedEncodingError, ConnectionError, ReadTimeout, Timeout
+from prtg_metrics import endpoint_name
+
+
+# Replies that mean PRTG (or a proxy in front of it) is overloaded or restarting
+retry_statuses = {429, 500, 502, 503, 504}
+idempotent_methods = {"GET", "HEAD", "OPTIONS"}
+# Endpoints whose replies PRTG builds slowly: a read timeout there usually means
+# it is still working on the query, so sending it again would only add load
+no_retry_after_read_timeout = {"historicdata.csv"}
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised for a call made while the circuit to its server is open."""
+
+
+def is_read_timeout(error):
+    # requests raises ReadTimeout while waiting for the headers, but a
+    # ConnectionError around urllib3's ReadTimeoutError while reading the body
+    return isinstance(error, ReadTimeout) or bool(error.args) and isinstance(error.args[0], ReadTimeoutError)
+
+
+class AdaptiveLimiter:
+    """AIMD limit on the number of requests in flight to one server.
+
+    The limit starts at initial and stays between 1 and maximum. Every call
+    that succeeds at normal latency adds 1/limit, so the limit grows by about
+    one per round of calls. A failed call, a throttling status or a short-term
+    latency above latency_tolerance x the long-term latency of the same
+    endpoint (judged once the endpoint has had warmup_calls calls) multiplies
+    it by backoff_factor. Only calls started after the last decrease can
+    decrease it again, so one burst of bad replies only counts once.
+    """
+
+    def __init__(self, maximum, initial=None, latency_tolerance=3.0, backoff_factor=0.5, warmup_calls=20):
+        self.maximum = maximum
+        self.limit = float(min(initial or maximum, maximum))
+        self.lowest_limit = self.limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+        self.warmup_calls = warmup_calls
+        self.in_flight = 0
+        self.decreases = 0
+        # endpoint -> [short-term, long-term] moving average of the call time, calls seen
+        self.latencies = {}
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, endpoint, started, ok):
+        """End a call that began at time.monotonic() value started."""
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            seconds = now - started
+            overloaded = not ok
+            if ok:
+                averages = self.latencies.setdefault(endpoint, [seconds, 0.0, 0])
+                averages[2] += 1
+                averages[0] += 0.3 * (seconds - averages[0])
+                # A plain mean while warming up, so the first few calls don't set the baseline alone
+                averages[1] += max(0.02, 1 / averages[2]) * (seconds - averages[1])
+                overloaded = averages[2] > self.warmup_calls and averages[0] > self.latency_tolerance * averages[1]
+
+            if not overloaded:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif started > self.last_decrease:
+                self.limit = max(1.0, self.limit * self.backoff_factor)
+                self.lowest_limit = min(self.lowest_limit, self.limit)
+                self.last_decrease = now
+                self.decreases += 1
+            self.condition.notify_all()
+
+
+class CircuitBreaker:
+    """Stops calls to a server after failures consecutive failed calls.
+
+    The circuit then stays open for open_seconds, doubling each time it opens
+    again straight away, up to max_open_seconds. After that one trial call is
+    let through (half-open): if it succeeds the circuit closes, otherwise it
+    opens again. Calls that wait for the circuit (see admit) also wait for the
+    trial's outcome.
+    """
+
+    def __init__(self, failures=5, open_seconds=30, max_open_seconds=300):
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.consecutive_failures = 0
+        self.current_open_seconds = open_seconds
+        self.open_until = None
+        self.trial_in_progress = False
+        self.opened = 0
+        self.condition = threading.Condition()
+
+    def admit(self, wait=True):
+        """Return "call" or "trial" once a call may go ahead, or None if it should fail fast.
+
+        With wait, a call that finds the circuit open waits for it to half-open
+        and, if another call is the trial, for the trial's outcome. It fails
+        fast if the circuit is open for longer than open_seconds (it has
+        opened again straight away, so the server is still down) or opens
+        again after the opening the call waited on. Wake-ups from other calls
+        recording their results don't end the wait early.
+        """
+        with self.condition:
+            # Which opening (self.opened at the time) this call is waiting out
+            waiting_on = None
+            while self.open_until is not None:
+                if waiting_on is not None and self.opened != waiting_on:
+                    return None
+                remaining = self.open_until - time.monotonic()
+                if remaining > 0:
+                    if not wait or (waiting_on is None and remaining > self.open_seconds):
+                        return None
+                    waiting_on = self.opened
+                    self.condition.wait(remaining)
+                elif not self.trial_in_progress:
+                    self.trial_in_progress = True
+                    return "trial"
+                elif not wait:
+                    return None
+                else:
+                    waiting_on = self.opened
+                    self.condition.wait()
+            return "call"
+
+    def record(self, ok, trial=False):
+        with self.condition:
+            if ok:
+                self.consecutive_failures = 0
+                self.current_open_seconds = self.open_seconds
+                self.open_until = None
+            else:
+                self.consecutive_failures += 1
+                if trial:
+                    self.current_open_seconds = min(self.current_open_seconds * 2, self.max_open_seconds)
+                if trial or (self.open_until is None and self.consecutive_failures >= self.failures):
+                    self.open_until = time.monotonic() + self.current_open_seconds
+                    self.opened += 1
+            if trial:
+                self.trial_in_progress = False
+            self.condition.notify_all()
+
+
+class ThrottledAdapter(BaseAdapter):
+    """Transport adapter that sends through another one with AIMD concurrency, retries and a circuit breaker.
+
+    Idempotent calls that fail to connect, time out, break off mid-body or get
+    one of retry_statuses are tried again up to retries times, after a full
+    jitter backoff (a random wait up to backoff_seconds x 2**attempt, capped at
+    max_backoff_seconds) or a longer Retry-After; read timeouts on the
+    endpoints in no_retry_after_read_timeout are not retried. Otherwise the
+    last response or error is returned as is. Calls the circuit breaker turns
+    away (see CircuitBreaker.admit) raise CircuitOpenError. Bodies of calls
+    that are not streamed are read here so a broken transfer can be retried
+    too. timeout, if set, applies to calls made without one.
+    """
+
+    def __init__(self, adapter, limiter, breaker, retries=3, backoff_seconds=0.5, max_backoff_seconds=30, timeout=None):
+        super().__init__()
+        self.adapter = adapter
+        self.limiter = limiter
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout = timeout
+        self.num_retries = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        endpoint = endpoint_name(request.url)
+        attempt = 0
+        while True:
+            admission = self.breaker.admit(request.method in idempotent_methods)
+            if admission is None:
+                raise CircuitOpenError(f"Circuit to {request.url.split('/api/')[0]} is open after repeated failures", request=request)
+
+            response = None
+            error = None
+            retryable = request.method in idempotent_methods
+            self.limiter.acquire()
+            started = time.monotonic()
+            ok = False
+            try:
+                response = self.adapter.send(request, stream=stream, timeout=timeout or self.timeout, **kwargs)
+                if not stream:
+                    response.content
+                ok = response.status_code not in retry_statuses
+            except (ConnectionError, Timeout, ChunkedEncodingError) as e:
+                error = e
+                retryable = retryable and not (is_read_timeout(e) and endpoint in no_retry_after_read_timeout)
+            finally:
+                self.limiter.release(endpoint, started, ok)
+                self.breaker.record(ok, admission == "trial")
+            if ok:
+                return response
+
+            if not retryable or attempt >= self.retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+            retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.max_backoff_seconds))
+            if response is not None:
+                response.close()
+            attempt += 1
+            with self.lock:
+                self.num_retries += 1
+            time.sleep(delay)
+
+    def stats(self):
+        return {"retries": self.num_retries, "circuit_opens": self.breaker.opened, "limit_decreases": self.limiter.decreases}
+
+    def close(self):
+        self.adapter.close()